@@ -3,10 +3,18 @@
 Aplicación Streamlit para detección de landmarks faciales.
 """
 
+import os
+import tempfile
+
 import streamlit as st
-from PIL import Image
-from src.detector import FaceLandmarkDetector
-from src.visualizacion import FaceLandmarkVisualizer
+from src import arranque
+
+arranque.marcar("app_inicio")
+
+# Los módulos de src no importan MediaPipe ni OpenCV al cargarse: cada
+# dependencia pesada se importa recién en el código que la usa.
+from src.detector import get_detector_pool
+from src.visualizacion import FaceLandmarkVisualizer, ESTILOS
 from src.expresiones import FacialExpressionAnalyzer
 from src.exportacion import (
     export_landmarks_json,
@@ -14,8 +22,13 @@ from src.exportacion import (
     export_expressions_json,
     create_download_link
 )
+from src.alineacion import align_faces
+from src.lote import process_batch, BatchZipWriter
+from src.video import export_annotated_video
 from src.utils import pil_to_cv2, cv2_to_pil, resize_image
-from src.config import TOTAL_LANDMARKS
+from src.config import PERFILES, BATCH_WORKERS, BATCH_ZIP_MAX_MEMORY, get_landmark_count, get_profile
+
+arranque.marcar("imports_listos")
 
 # Configuración de la página
 st.set_page_config(
@@ -44,11 +57,29 @@ with st.sidebar:
 
     st.divider()
 
+    # Perfil de rendimiento (por defecto el de la CLI o LANDMARKS_PROFILE)
+    st.header("⚙️ Perfil de Rendimiento")
+    nombres_perfiles = list(PERFILES)
+    profile_name = st.selectbox(
+        "Elegí el perfil:",
+        nombres_perfiles,
+        index=nombres_perfiles.index(get_profile()["nombre"]),
+        help="realtime prioriza velocidad, accurate prioriza precisión"
+    )
+    perfil = get_profile(profile_name)
+
+    # Precargar el modelo en segundo plano mientras se dibuja la página
+    get_detector_pool(perfil).warm_up()
+    st.caption(
+        f"Resolución {perfil['ancho_maximo']} px · hasta {perfil['max_num_faces']} rostro(s) · "
+        f"iris {'sí' if perfil['refine_landmarks'] else 'no'}"
+    )
+
     # Controles de visualización
     st.header("🎨 Estilo de Visualización")
     visualization_style = st.selectbox(
         "Elegí el estilo de dibujo:",
-        ["Puntos Simples", "Malla Conectada", "Contornos Principales", "Heatmap"],
+        list(ESTILOS),
         help="Diferentes formas de mostrar los landmarks detectados"
     )
 
@@ -57,6 +88,10 @@ with st.sidebar:
         "Analizar expresiones faciales",
         help="Calcula métricas como apertura de boca, ojos y inclinación de cabeza"
     )
+    align_shapes = st.checkbox(
+        "Alinear formas (marco canónico)",
+        help="Alinea cada rostro por separado (ojos horizontales, distancia entre ojos fija) antes de medir y agrega las coordenadas alineadas a la exportación"
+    )
 
     st.header("💾 Exportación de Datos")
     export_format = st.selectbox(
@@ -65,17 +100,156 @@ with st.sidebar:
         help="Formato para descargar las coordenadas de landmarks"
     )
 
+    st.header("🎬 Modo de Entrada")
+    input_mode = st.radio(
+        "Procesar:",
+        ["Imagen", "Video"],
+        horizontal=True,
+        help="En modo video se dibuja el estilo elegido en cada frame y se descarga el video anotado"
+    )
+
     st.divider()
     st.caption("Desarrollado en el Laboratorio 2 - IFTS24")
 
-# Uploader de imagen
-uploaded_file = st.file_uploader(
-    "📤 Subí una imagen con un rostro",
+    with st.expander("⏱️ Tiempos de arranque"):
+        st.code(arranque.format_report(), language=None)
+
+if input_mode == "Video":
+    uploaded_video = st.file_uploader(
+        "📤 Subí un video con rostros",
+        type=["mp4", "mov", "avi", "mkv"],
+        help="Formatos aceptados: MP4, MOV, AVI, MKV"
+    )
+
+    if uploaded_video is None:
+        st.info("📤 Subí un video para generar la versión anotada")
+        st.stop()
+
+    sufijo = os.path.splitext(uploaded_video.name)[1] or ".mp4"
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_entrada = os.path.join(directorio, f"entrada{sufijo}")
+        ruta_salida = os.path.join(directorio, "anotado.mp4")
+        with open(ruta_entrada, "wb") as f:
+            f.write(uploaded_video.getbuffer())
+
+        barra = st.progress(0.0, text="🎬 Procesando video...")
+
+        def actualizar_progreso(frames, total):
+            if total:
+                barra.progress(min(frames / total, 1.0), text=f"🎬 Frame {frames}/{total}")
+
+        try:
+            stats = export_annotated_video(ruta_entrada, ruta_salida,
+                                           estilo=visualization_style, perfil=perfil,
+                                           progreso=actualizar_progreso)
+        except ValueError as error:
+            barra.empty()
+            st.error(f"❌ {error}")
+            st.stop()
+
+        barra.progress(1.0, text="✅ Video procesado")
+        with open(ruta_salida, "rb") as f:
+            video_anotado = f.read()
+
+    video_col1, video_col2, video_col3 = st.columns(3)
+    with video_col1:
+        st.metric("🎞️ Frames", stats["frames"])
+    with video_col2:
+        st.metric("⚡ FPS sostenidos", f"{stats['fps_sostenido']:.1f}")
+    with video_col3:
+        if stats["memoria_pico_mb"] is not None:
+            st.metric("🧠 Memoria pico", f"{stats['memoria_pico_mb']:.0f} MB")
+
+    st.caption(f"Frame rate de salida: {stats['fps_fuente']:.2f} fps · "
+               f"frames en vuelo (máx.): {stats['frames_en_vuelo_pico']}")
+
+    st.download_button(
+        label="🎬 Descargar Video Anotado (MP4)",
+        data=video_anotado,
+        file_name=f"anotado_{os.path.splitext(uploaded_video.name)[0]}.mp4",
+        mime="video/mp4",
+        key="download_video"
+    )
+    st.stop()
+
+# Uploader de imágenes (con más de una se procesan en lote)
+uploaded_files = st.file_uploader(
+    "📤 Subí una o varias imágenes con rostros",
     type=["jpg", "jpeg", "png"],
-    help="Formatos aceptados: JPG, JPEG, PNG"
+    accept_multiple_files=True,
+    help="Formatos aceptados: JPG, JPEG, PNG. Con varias imágenes se descarga un único ZIP"
 )
 
+if len(uploaded_files) > 1:
+    st.header(f"🗂️ Procesamiento en lote ({len(uploaded_files)} imágenes)")
+
+    # Las reejecuciones (por ejemplo al descargar) reutilizan el ZIP ya armado.
+    # Se guarda en un SpooledTemporaryFile: queda en memoria hasta
+    # BATCH_ZIP_MAX_MEMORY y después pasa a un archivo temporal anónimo, que
+    # se borra al cerrarlo (al cambiar de lote) o al terminar la sesión.
+    clave_lote = (
+        tuple((archivo.name, archivo.size) for archivo in uploaded_files),
+        perfil["nombre"], analyze_expressions, align_shapes, export_format
+    )
+    lote = st.session_state.get("lote")
+    if lote is None or lote["clave"] != clave_lote:
+        if lote is not None:
+            lote["archivo"].close()
+            del st.session_state["lote"]
+
+        barra = st.progress(0.0, text="🔍 Procesando imágenes...")
+        tabla = st.empty()
+        destino = tempfile.SpooledTemporaryFile(max_size=BATCH_ZIP_MAX_MEMORY, suffix=".zip")
+        try:
+            with BatchZipWriter(destino, formato=export_format,
+                                decimales=perfil["decimales_exportacion"]) as zip_writer:
+                archivos = ((archivo.name, archivo) for archivo in uploaded_files)
+                for hechas, resultado in enumerate(
+                        process_batch(archivos, perfil, workers=BATCH_WORKERS,
+                                      analizar=analyze_expressions, alinear=align_shapes), 1):
+                    zip_writer.add(resultado)
+                    barra.progress(hechas / len(uploaded_files),
+                                   text=f"🔍 {hechas}/{len(uploaded_files)} · {resultado['nombre']}")
+                    tabla.dataframe(zip_writer.summary(), use_container_width=True)
+                resumen = zip_writer.summary()
+            stats_lote = zip_writer.close()
+        except BaseException:
+            # Incluye la interrupción de Streamlit al cambiar la entrada a mitad del lote
+            destino.close()
+            raise
+        arranque.marcar("primera_deteccion")
+        arranque.print_report_if_enabled()
+        barra.progress(1.0, text="✅ Lote procesado")
+
+        lote = {"clave": clave_lote, "archivo": destino, "resumen": resumen, "stats": stats_lote}
+        st.session_state["lote"] = lote
+    else:
+        st.dataframe(lote["resumen"], use_container_width=True)
+
+    lote_col1, lote_col2, lote_col3 = st.columns(3)
+    with lote_col1:
+        st.metric("🖼️ Imágenes", lote["stats"]["imagenes"])
+    with lote_col2:
+        st.metric("👤 Rostros detectados", lote["stats"]["rostros"])
+    with lote_col3:
+        st.metric("⚠️ Con errores", lote["stats"]["errores"])
+
+    # download_button no acepta un SpooledTemporaryFile: se le pasan los bytes
+    lote["archivo"].seek(0)
+    st.download_button(
+        label=f"🗂️ Descargar Lote ({export_format} en ZIP)",
+        data=lote["archivo"].read(),
+        file_name="landmarks_lote.zip",
+        mime="application/zip",
+        key="download_batch"
+    )
+    st.stop()
+
+uploaded_file = uploaded_files[0] if uploaded_files else None
+
 if uploaded_file is not None:
+    from PIL import Image
+
     # Cargar imagen
     imagen_original = Image.open(uploaded_file)
 
@@ -83,7 +257,7 @@ if uploaded_file is not None:
     imagen_cv2 = pil_to_cv2(imagen_original)
 
     # Redimensionar si es muy grande
-    imagen_cv2 = resize_image(imagen_cv2, max_width=800)
+    imagen_cv2 = resize_image(imagen_cv2, max_width=perfil["ancho_maximo"])
 
     # Columnas para mostrar antes/después
     col1, col2 = st.columns(2)
@@ -97,25 +271,20 @@ if uploaded_file is not None:
 
     # Detectar landmarks
     with st.spinner("🔍 Detectando landmarks faciales..."):
-        detector = FaceLandmarkDetector()
-        imagen_procesada, landmarks, info = detector.detect(imagen_cv2)
-        detector.close()
+        with get_detector_pool(perfil).detector() as detector:
+            imagen_procesada, landmarks, info = detector.detect(imagen_cv2)
+        arranque.marcar("primera_deteccion")
+        arranque.print_report_if_enabled()
 
     # Aplicar estilo de visualización seleccionado
     if info["deteccion_exitosa"] and landmarks:
-        visualizer = FaceLandmarkVisualizer()
+        visualizer = FaceLandmarkVisualizer(nivel_detalle=perfil["nivel_detalle"])
 
         # Tomar el primer rostro para visualización
         primer_rostro = landmarks[0] if isinstance(landmarks, list) else landmarks
 
-        if visualization_style == "Puntos Simples":
-            imagen_visualizada = visualizer.draw_points_only(imagen_cv2, primer_rostro)
-        elif visualization_style == "Malla Conectada":
-            imagen_visualizada = visualizer.draw_mesh_tesselation(imagen_cv2, primer_rostro)
-        elif visualization_style == "Contornos Principales":
-            imagen_visualizada = visualizer.draw_contours_only(imagen_cv2, primer_rostro)
-        elif visualization_style == "Heatmap":
-            imagen_visualizada = visualizer.create_heatmap_overlay(imagen_cv2, primer_rostro)
+        if visualization_style in ESTILOS:
+            imagen_visualizada = visualizer.render(imagen_cv2, primer_rostro, visualization_style)
         else:
             imagen_visualizada = imagen_procesada  # Fallback
     else:
@@ -134,6 +303,10 @@ if uploaded_file is not None:
     if info["deteccion_exitosa"]:
         st.success("✅ Detección exitosa")
 
+        # Formas alineadas para el analizador y los exportadores
+        alineados = (align_faces(landmarks, imagen_cv2.shape[0], imagen_cv2.shape[1])
+                     if align_shapes else None)
+
         # Métricas principales
         metric_col1, metric_col2, metric_col3 = st.columns(3)
 
@@ -141,10 +314,12 @@ if uploaded_file is not None:
             st.metric("👤 Rostros detectados", info["rostros_detectados"])
 
         with metric_col2:
-            st.metric("📍 Landmarks detectados", f"{info['total_landmarks']}/{TOTAL_LANDMARKS}")
+            # 468 por rostro si el perfil no refina el iris
+            esperados = get_landmark_count(perfil) * info["rostros_detectados"]
+            st.metric("📍 Landmarks detectados", f"{info['total_landmarks']}/{esperados}")
 
         with metric_col3:
-            porcentaje = (info['total_landmarks'] / TOTAL_LANDMARKS) * 100
+            porcentaje = (info['total_landmarks'] / esperados) * 100
             st.metric("🎯 Precisión", f"{porcentaje:.1f}%")
 
         # Análisis de expresiones (si está habilitado)
@@ -152,28 +327,38 @@ if uploaded_file is not None:
             st.header("😊 Análisis de Expresiones")
 
             analyzer = FacialExpressionAnalyzer()
-            # Tomar el primer rostro para análisis de expresiones
-            primer_rostro = landmarks[0] if isinstance(landmarks, list) and landmarks else None
-            if primer_rostro:
-                expresion_data = analyzer.analizar_expresion_basica(primer_rostro, imagen_cv2.shape[0], imagen_cv2.shape[1])
+            alto, ancho = imagen_cv2.shape[:2]
+            # Todos los rostros, igual que en el procesamiento en lote
+            expresiones = []
+            for rostro_idx, face_landmarks in enumerate(landmarks):
+                expresion_data = analyzer.analizar_expresion_basica(
+                    face_landmarks, alto, ancho,
+                    forma_alineada=alineados[rostro_idx] if alineados is not None else None
+                )
+                expresion_data["rostro_id"] = rostro_idx
+                expresiones.append(expresion_data)
+
+            for expresion_data in expresiones:
+                if len(expresiones) > 1:
+                    st.subheader(f"👤 Rostro {expresion_data['rostro_id'] + 1}")
 
-            # Mostrar métricas de expresión
-            exp_col1, exp_col2, exp_col3 = st.columns(3)
+                # Mostrar métricas de expresión
+                exp_col1, exp_col2, exp_col3 = st.columns(3)
 
-            with exp_col1:
-                st.metric("👄 Apertura Boca", f"{expresion_data['apertura_boca']:.3f}")
+                with exp_col1:
+                    st.metric("👄 Apertura Boca", f"{expresion_data['apertura_boca']:.3f}")
 
-            with exp_col2:
-                st.metric("👁️ Apertura Ojos", f"{expresion_data['apertura_ojos']['promedio']:.3f}")
+                with exp_col2:
+                    st.metric("👁️ Apertura Ojos", f"{expresion_data['apertura_ojos']['promedio']:.3f}")
 
-            with exp_col3:
-                st.metric("📐 Inclinación Cabeza", f"{expresion_data['inclinacion_cabeza']:.3f}°")
+                with exp_col3:
+                    st.metric("📐 Inclinación Cabeza", f"{expresion_data['inclinacion_cabeza']:.3f}°")
 
-            # Clasificación de expresión
-            st.info(f"**Expresión detectada:** {expresion_data['expresion_detectada'].replace('_', ' ').title()}")
+                # Clasificación de expresión
+                st.info(f"**Expresión detectada:** {expresion_data['expresion_detectada'].replace('_', ' ').title()}")
 
             # Exportar datos de expresiones
-            expressions_json, expr_filename = export_expressions_json(expresion_data)
+            expressions_json, expr_filename = export_expressions_json(expresiones)
             st.download_button(
                 label="📊 Descargar Análisis de Expresiones (JSON)",
                 data=expressions_json,
@@ -186,10 +371,14 @@ if uploaded_file is not None:
         st.header("💾 Exportar Datos")
 
         if export_format == "JSON":
-            landmarks_data, filename = export_landmarks_json(landmarks, imagen_cv2.shape[0], imagen_cv2.shape[1])
+            landmarks_data, filename = export_landmarks_json(landmarks, imagen_cv2.shape[0], imagen_cv2.shape[1],
+                                                             alineados=alineados,
+                                                             decimales=perfil["decimales_exportacion"])
             mime_type = "application/json"
         else:  # CSV
-            landmarks_data, filename = export_landmarks_csv(landmarks, imagen_cv2.shape[0], imagen_cv2.shape[1])
+            landmarks_data, filename = export_landmarks_csv(landmarks, imagen_cv2.shape[0], imagen_cv2.shape[1],
+                                                            alineados=alineados,
+                                                            decimales=perfil["decimales_exportacion"])
             mime_type = "text/csv"
 
         st.download_button(
@@ -212,7 +401,7 @@ if uploaded_file is not None:
 
 else:
     # Mensaje de bienvenida
-    st.info("📤 Subí una imagen para comenzar la detección")
+    st.info("📤 Subí una imagen para comenzar la detección (o varias para procesarlas en lote)")
 
     # Información sobre estilos de visualización
     st.header("🎨 Estilos de Visualización Disponibles")
@@ -0,0 +1,323 @@
+# src/alineacion.py
+"""
+Alineación de Procrustes y normalización de formas faciales.
+
+Elimina posición, escala y rotación de los landmarks para que las
+métricas y comparaciones dependan solo de la forma del rostro.
+Todas las funciones trabajan con lotes (N, landmarks, 3) y resuelven las
+rotaciones con un único SVD por lote.
+
+Los rostros de una imagen se alinean cada uno por separado a un marco
+canónico fijo (canonical_align), así su forma alineada no depende de los
+otros rostros ni del tamaño del rostro en la imagen. El Procrustes
+generalizado queda para estimar la forma media de un dataset.
+
+MediaPipe normaliza x por el ancho e y por el alto de la imagen, así que
+en una imagen no cuadrada rotar o escalar esas coordenadas deforma el
+rostro. Antes de alinear, to_isotropic lleva x y z a unidades de alto
+(multiplica por ancho / alto); todas las funciones de este módulo
+trabajan en ese espacio isótropo. Las formas alineadas por align_faces
+quedan en el marco canónico (un cuadro de lado 1 en unidades de alto),
+comparable entre imágenes de cualquier proporción.
+"""
+
+import numpy as np
+
+from .config import (
+    GPA_MAX_ITERATIONS,
+    GPA_TOLERANCE,
+    GPA_CHUNK_SIZE,
+    ALIGN_EYE_DISTANCE,
+    ALIGN_CENTER
+)
+from .exportacion import landmarks_to_array
+
+# Esquinas externas de los ojos (mismos puntos que calcular_inclinacion_cabeza)
+_OJO_IZQUIERDO = 33
+_OJO_DERECHO = 263
+
+
+def to_isotropic(shapes, alto, ancho):
+    """
+    Convierte coordenadas normalizadas de MediaPipe a unidades de alto:
+    x y z se multiplican por ancho / alto, y queda igual. En ese espacio
+    una rotación o un cambio de escala es rígido en la imagen real.
+
+    Args:
+        shapes (numpy.ndarray): Formas (N, landmarks, 3) o (landmarks, 3)
+        alto (int | array-like): Alto de la imagen (o uno por forma del lote)
+        ancho (int | array-like): Ancho de la imagen (o uno por forma del lote)
+
+    Returns:
+        numpy.ndarray: Formas float32 con la forma de entrada
+    """
+    shapes = np.array(shapes, dtype=np.float32)
+    alto = np.asarray(alto, dtype=np.float64)
+    ancho = np.asarray(ancho, dtype=np.float64)
+    # Sin tamaño registrado (0) se deja la forma como está
+    factor = np.where(alto > 0, ancho / np.where(alto > 0, alto, 1.0), 1.0)
+    if factor.ndim:
+        factor = factor[:, None]  # Un factor por forma del lote
+    shapes[..., 0] *= factor
+    shapes[..., 2] *= factor
+    return shapes
+
+
+def procrustes_align(shapes, referencia, escalar=True):
+    """
+    Alinea un lote de formas a una referencia (Procrustes ordinario).
+
+    Args:
+        shapes (numpy.ndarray): Formas (N, landmarks, 3) o (landmarks, 3)
+        referencia (numpy.ndarray): Forma destino (landmarks, 3)
+        escalar (bool): Ajustar también la escala de cada forma
+
+    Returns:
+        numpy.ndarray: Formas alineadas float32 con la forma de entrada
+    """
+    shapes = np.asarray(shapes, dtype=np.float64)
+    unica = shapes.ndim == 2
+    if unica:
+        shapes = shapes[np.newaxis]
+    referencia = np.asarray(referencia, dtype=np.float64)
+
+    centro_ref = referencia.mean(axis=0)
+    ref_c = referencia - centro_ref
+    centradas = shapes - shapes.mean(axis=1, keepdims=True)
+
+    # Rotación óptima por forma: SVD batched de las matrices de covarianza 3x3
+    covarianzas = np.einsum("nli,lj->nij", centradas, ref_c)
+    u, s, vt = np.linalg.svd(covarianzas)
+
+    # Evitar reflexiones: invertir el último eje si det(R) < 0
+    signo = np.sign(np.linalg.det(u @ vt))
+    signo[signo == 0] = 1.0
+    u[:, :, -1] *= signo[:, None]
+    s[:, -1] *= signo
+    rotaciones = u @ vt
+
+    alineadas = centradas @ rotaciones
+    if escalar:
+        normas2 = np.einsum("nli,nli->n", centradas, centradas)
+        normas2[normas2 == 0] = 1.0
+        alineadas *= (s.sum(axis=1) / normas2)[:, None, None]
+    alineadas += centro_ref
+
+    alineadas = alineadas.astype(np.float32)
+    return alineadas[0] if unica else alineadas
+
+
+def canonical_align(shapes, distancia_ojos=ALIGN_EYE_DISTANCE, centro=ALIGN_CENTER):
+    """
+    Lleva cada forma, por separado, a un marco canónico fijo: centroide en
+    `centro`, línea entre las esquinas externas de los ojos horizontal y
+    distancia entre ellas igual a `distancia_ojos`.
+
+    Args:
+        shapes (numpy.ndarray): Formas (N, landmarks, 3) o (landmarks, 3)
+        distancia_ojos (float): Distancia interocular canónica
+        centro (tuple): Centroide canónico (x, y, z)
+
+    Returns:
+        numpy.ndarray: Formas alineadas float32 con la forma de entrada
+    """
+    shapes = np.asarray(shapes, dtype=np.float64)
+    unica = shapes.ndim == 2
+    if unica:
+        shapes = shapes[np.newaxis]
+    if shapes.shape[1] <= _OJO_DERECHO:
+        raise ValueError(
+            f"Se necesitan al menos {_OJO_DERECHO + 1} landmarks para el marco canónico"
+        )
+
+    centradas = shapes - shapes.mean(axis=1, keepdims=True)
+
+    # Rotación por -angulo alrededor del eje z, una matriz por forma
+    delta = shapes[:, _OJO_DERECHO, :2] - shapes[:, _OJO_IZQUIERDO, :2]
+    angulos = np.arctan2(delta[:, 1], delta[:, 0])
+    cos, sin = np.cos(angulos), np.sin(angulos)
+    rotaciones = np.zeros((len(shapes), 3, 3))
+    rotaciones[:, 0, 0] = cos
+    rotaciones[:, 0, 1] = -sin
+    rotaciones[:, 1, 0] = sin
+    rotaciones[:, 1, 1] = cos
+    rotaciones[:, 2, 2] = 1.0
+
+    distancias = np.hypot(delta[:, 0], delta[:, 1])
+    distancias[distancias == 0] = 1.0
+
+    alineadas = centradas @ rotaciones
+    alineadas *= (distancia_ojos / distancias)[:, None, None]
+    alineadas += np.asarray(centro, dtype=np.float64)
+
+    alineadas = alineadas.astype(np.float32)
+    return alineadas[0] if unica else alineadas
+
+
+def _orientar(forma):
+    """
+    Rota una forma centrada en el plano de la imagen para que la línea
+    entre los ojos quede horizontal (orientación canónica de la media).
+    """
+    if forma.shape[0] <= _OJO_DERECHO:
+        return forma
+
+    delta = forma[_OJO_DERECHO] - forma[_OJO_IZQUIERDO]
+    angulo = np.arctan2(delta[1], delta[0])
+    cos, sin = np.cos(angulo), np.sin(angulo)
+    # Rotación por -angulo alrededor del eje z (vectores fila)
+    rotacion = np.array([[cos, -sin, 0.0], [sin, cos, 0.0], [0.0, 0.0, 1.0]])
+    return forma @ rotacion
+
+
+def _normalizar_media(media, centroide, tamano):
+    """Centra, orienta y lleva la media al tamaño y centroide de los datos."""
+    centrada = media - media.mean(axis=0)
+    norma = np.linalg.norm(centrada)
+    if norma > 0:
+        centrada *= tamano / norma
+    return _orientar(centrada) + centroide
+
+
+def _iter_bloques(fuente, tamano_bloque):
+    """Recorre una fuente de formas en bloques (N, landmarks, 3)."""
+    if hasattr(fuente, "iter_shards"):
+        # LandmarkDatasetStore: un shard puede ser mayor que el bloque pedido.
+        # El almacén guarda coordenadas normalizadas; se corrigen con el
+        # tamaño de imagen registrado en los metadatos de cada rostro.
+        for _, landmarks, meta in fuente.iter_shards():
+            for inicio in range(0, len(landmarks), tamano_bloque):
+                fin = inicio + tamano_bloque
+                yield to_isotropic(landmarks[inicio:fin], meta["alto"][inicio:fin],
+                                   meta["ancho"][inicio:fin])
+    elif callable(fuente):
+        for bloque in fuente():
+            yield np.asarray(bloque)
+    else:
+        for inicio in range(0, len(fuente), tamano_bloque):
+            yield np.asarray(fuente[inicio:inicio + tamano_bloque])
+
+
+def generalized_procrustes_chunked(fuente, max_iter=GPA_MAX_ITERATIONS,
+                                   tolerancia=GPA_TOLERANCE,
+                                   tamano_bloque=GPA_CHUNK_SIZE):
+    """
+    Estima la forma media (Procrustes generalizado) recorriendo los datos
+    por bloques, sin cargarlos completos en memoria.
+
+    Args:
+        fuente: LandmarkDatasetStore, arreglo o memmap (N, landmarks, 3), o
+            una función sin argumentos que devuelva un iterable de bloques.
+            Los arreglos y bloques deben estar en el espacio isótropo
+            (to_isotropic); el almacén se convierte solo.
+        max_iter (int): Iteraciones máximas
+        tolerancia (float): Cambio relativo de la media para cortar
+        tamano_bloque (int): Rostros por bloque
+
+    Returns:
+        numpy.ndarray: Forma media float32 (landmarks, 3)
+    """
+    # Primera pasada: centroide y tamaño promedio, referencia inicial
+    referencia = None
+    suma_centroides = 0.0
+    suma_tamanos = 0.0
+    total = 0
+    for bloque in _iter_bloques(fuente, tamano_bloque):
+        if len(bloque) == 0:
+            continue
+        bloque = bloque.astype(np.float64)
+        centroides = bloque.mean(axis=1)
+        suma_centroides = suma_centroides + centroides.sum(axis=0)
+        suma_tamanos += np.linalg.norm(bloque - centroides[:, None], axis=(1, 2)).sum()
+        total += len(bloque)
+        if referencia is None:
+            referencia = bloque[0]
+
+    if total == 0:
+        raise ValueError("No hay formas para alinear")
+
+    centroide = suma_centroides / total
+    tamano = suma_tamanos / total
+    media = _normalizar_media(referencia, centroide, tamano)
+
+    for _ in range(max_iter):
+        suma = np.zeros_like(media)
+        for bloque in _iter_bloques(fuente, tamano_bloque):
+            if len(bloque):
+                suma += procrustes_align(bloque, media).sum(axis=0, dtype=np.float64)
+        nueva = _normalizar_media(suma / total, centroide, tamano)
+
+        cambio = np.linalg.norm(nueva - media) / tamano
+        media = nueva
+        if cambio < tolerancia:
+            break
+
+    return media.astype(np.float32)
+
+
+def generalized_procrustes(shapes, max_iter=GPA_MAX_ITERATIONS,
+                           tolerancia=GPA_TOLERANCE):
+    """
+    Procrustes generalizado en memoria.
+
+    Args:
+        shapes: Landmarks de MediaPipe o ndarray (N, landmarks, 3)
+        max_iter (int): Iteraciones máximas
+        tolerancia (float): Cambio relativo de la media para cortar
+
+    Returns:
+        tuple: (formas alineadas (N, landmarks, 3), forma media (landmarks, 3))
+    """
+    coords = landmarks_to_array(shapes)
+    media = generalized_procrustes_chunked(coords, max_iter, tolerancia,
+                                           tamano_bloque=max(len(coords), 1))
+    return procrustes_align(coords, media), media
+
+
+def iter_aligned(fuente, media, tamano_bloque=GPA_CHUNK_SIZE):
+    """
+    Alinea una fuente grande a una forma media, bloque por bloque.
+
+    Args:
+        fuente: Igual que en generalized_procrustes_chunked
+        media (numpy.ndarray): Forma media (landmarks, 3)
+        tamano_bloque (int): Rostros por bloque
+
+    Yields:
+        numpy.ndarray: Bloques de formas alineadas (n, landmarks, 3)
+    """
+    for bloque in _iter_bloques(fuente, tamano_bloque):
+        if len(bloque):
+            yield procrustes_align(bloque, media)
+
+
+def align_faces(landmarks, alto, ancho, referencia=None):
+    """
+    Alinea los rostros detectados en una imagen, cada uno por separado.
+
+    Las coordenadas se pasan primero al espacio isótropo (to_isotropic),
+    así el resultado no depende de la proporción de la imagen. Sin
+    referencia, cada rostro se lleva al marco canónico fijo
+    (canonical_align), que normaliza posición, rotación en el plano y
+    escala por la distancia entre los ojos. Con la forma media de un
+    dataset como referencia (calculada sobre el almacén, que ya se
+    convierte al espacio isótropo), se usa Procrustes ordinario contra
+    ella. En ambos casos el resultado de un rostro no depende de los demás.
+
+    Args:
+        landmarks: Lista de NormalizedLandmarkList de MediaPipe o ndarray
+        alto (int): Alto de la imagen donde se detectaron
+        ancho (int): Ancho de la imagen donde se detectaron
+        referencia (numpy.ndarray, optional): Forma media de un dataset
+
+    Returns:
+        numpy.ndarray: Formas alineadas float32 (rostros, landmarks, 3) en
+            el marco canónico (unidades de alto, no de la imagen original)
+    """
+    coords = landmarks_to_array(landmarks)
+    if coords.shape[0] == 0:
+        return coords
+    coords = to_isotropic(coords, alto, ancho)
+    if referencia is not None:
+        return procrustes_align(coords, referencia)
+    return canonical_align(coords)
@@ -0,0 +1,181 @@
+# src/arranque.py
+"""
+Medición de tiempos de arranque (cold start) de la aplicación.
+
+Registra marcas en segundos desde el inicio del proceso y duraciones de
+tareas puntuales (imports, precarga del modelo, primera detección).
+Cada marca se guarda solo la primera vez, así las reejecuciones del
+script de Streamlit no la pisan. Las tareas que fallan no registran
+duración: quedan en los errores del reporte.
+
+Uso desde la línea de comandos (mide imports y carga del modelo):
+    python -m src.arranque [--perfil realtime]
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+STARTUP_REPORT_ENV = "LANDMARKS_STARTUP_REPORT"  # "1" imprime el reporte en stderr
+
+_REFERENCIA = time.perf_counter()
+_MARCAS = {}
+_DURACIONES = {}
+_ERRORES = {}
+_LOCK = threading.Lock()
+_IMPRESO = threading.Event()
+
+
+def _edad_proceso():
+    """
+    Segundos transcurridos desde que arrancó el proceso (Linux, vía /proc).
+    Si no se puede calcular, devuelve None.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # El nombre del comando puede tener espacios: se corta después de ")"
+            campos = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(campos[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+# Desfase entre el inicio del proceso y la importación de este módulo
+_EDAD_AL_IMPORTAR = _edad_proceso() or 0.0
+
+
+def ahora():
+    """Segundos desde el inicio del proceso (o desde importar este módulo)."""
+    return _EDAD_AL_IMPORTAR + time.perf_counter() - _REFERENCIA
+
+
+def marcar(nombre):
+    """
+    Registra una marca de tiempo (solo la primera vez que se alcanza).
+
+    Args:
+        nombre (str): Nombre de la marca, por ejemplo "primera_deteccion"
+    """
+    with _LOCK:
+        _MARCAS.setdefault(nombre, ahora())
+
+
+@contextmanager
+def medir(nombre):
+    """
+    Context manager que registra la duración de un bloque (la primera vez).
+    Si el bloque lanza una excepción no se registra nada y la excepción
+    se propaga: una tarea fallida no debe figurar como terminada.
+
+    Ejemplo:
+        with arranque.medir("import_mediapipe"):
+            import mediapipe
+    """
+    inicio = time.perf_counter()
+    yield
+    with _LOCK:
+        _DURACIONES.setdefault(nombre, time.perf_counter() - inicio)
+
+
+def registrar_error(nombre, error):
+    """
+    Registra que una tarea de arranque falló (solo el primer error).
+
+    Args:
+        nombre (str): Nombre de la tarea, por ejemplo "precarga_modelo_balanced"
+        error (BaseException | str): Error producido
+    """
+    with _LOCK:
+        _ERRORES.setdefault(nombre, str(error) or type(error).__name__)
+
+
+def report():
+    """
+    Devuelve el reporte de arranque.
+
+    Returns:
+        dict: {"marcas": {nombre: segundos desde inicio},
+               "duraciones": {nombre: segundos},
+               "errores": {nombre: mensaje}}
+    """
+    with _LOCK:
+        return {
+            "marcas": dict(sorted(_MARCAS.items(), key=lambda item: item[1])),
+            "duraciones": dict(_DURACIONES),
+            "errores": dict(_ERRORES)
+        }
+
+
+def format_report(reporte=None):
+    """
+    Formatea el reporte como texto de una línea por entrada.
+
+    Args:
+        reporte (dict, optional): Resultado de report(). Si None, el actual.
+
+    Returns:
+        str: Reporte legible
+    """
+    reporte = report() if reporte is None else reporte
+    lineas = ["Marcas (s desde el inicio del proceso):"]
+    lineas += [f"  {nombre:<32} {segundos:8.3f}" for nombre, segundos in reporte["marcas"].items()]
+    lineas.append("Duraciones (s):")
+    lineas += [f"  {nombre:<32} {segundos:8.3f}" for nombre, segundos in reporte["duraciones"].items()]
+    if reporte.get("errores"):
+        lineas.append("Errores:")
+        lineas += [f"  {nombre:<32} {mensaje}" for nombre, mensaje in reporte["errores"].items()]
+    return "\n".join(lineas)
+
+
+def print_report_if_enabled():
+    """Imprime el reporte en stderr una sola vez si LANDMARKS_STARTUP_REPORT=1."""
+    if os.environ.get(STARTUP_REPORT_ENV) == "1" and not _IMPRESO.is_set():
+        _IMPRESO.set()
+        print(format_report(), file=sys.stderr)
+
+
+def main(argv=None):
+    """
+    Mide en frío el costo de cada dependencia y de cargar el modelo.
+    Conviene correrlo en un proceso nuevo para obtener tiempos reales.
+
+    Returns:
+        int: Código de salida (1 si no se pudo precargar el modelo)
+    """
+    import argparse
+    import importlib
+
+    from .config import get_profile
+
+    parser = argparse.ArgumentParser(description="Reporte de tiempos de arranque")
+    parser.add_argument("--perfil", "--profile", dest="perfil", default=None)
+    args = parser.parse_args(argv)
+
+    marcar("inicio_medicion")
+    for modulo in ("numpy", "PIL.Image", "cv2", "mediapipe", "streamlit"):
+        try:
+            with medir(f"import_{modulo}"):
+                importlib.import_module(modulo)
+        except ImportError as error:
+            registrar_error(f"import_{modulo}", error)
+            print(f"No se pudo importar {modulo}: {error}", file=sys.stderr)
+
+    from .detector import get_detector_pool
+    pool = get_detector_pool(get_profile(args.perfil))
+    pool.warm_up().join()
+    if pool.error_precarga is None:
+        marcar("modelo_listo")
+
+    print(format_report())
+    if pool.error_precarga is not None:
+        print(f"No se pudo precargar el modelo: {pool.error_precarga}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
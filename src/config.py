@@ -3,10 +3,178 @@
 Configuración del detector de landmarks faciales.
 """
 
+import argparse
+import os
+import sys
+
+# Raíz del proyecto (las rutas de datos no dependen del directorio de trabajo)
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 # Configuración de visualización (compatible con face_recognition)
 LANDMARK_COLOR = (0, 255, 0)  # Verde en BGR
 LANDMARK_RADIUS = 2
 LANDMARK_THICKNESS = -1  # Relleno
 
 # Cantidad aproximada de landmarks (MediaPipe Face Mesh tiene 478 puntos)
-TOTAL_LANDMARKS = 478
\ No newline at end of file
+TOTAL_LANDMARKS = 478
+LANDMARKS_SIN_IRIS = 468  # Sin refine_landmarks no se detectan los 10 puntos del iris
+
+# Formato compacto de secuencias de landmarks (src/secuencias.py)
+# Las coordenadas normalizadas se guardan como int16: valor * escala.
+# Con 16384 el rango representable es [-2, 2) y el paso de 6.1e-5.
+SEQUENCE_QUANT_SCALE = 16384
+SEQUENCE_CHUNK_FRAMES = 64  # Frames por bloque comprimido (granularidad de acceso)
+SEQUENCE_COMPRESSION_LEVEL = 6  # Nivel de zlib
+
+# Almacén de datasets de landmarks (src/dataset.py)
+DATASET_SHARD_SIZE = 16384  # Rostros por shard memmap (~94 MB con 478 puntos)
+DATASET_CHECKPOINT_EVERY = 1024  # Rostros entre checkpoints automáticos
+
+# Índice de similitud de formas (src/similitud.py)
+SIMILARITY_APPROX_THRESHOLD = 50000  # Desde cuántas formas usar el índice aproximado
+SIMILARITY_PROJECTION_DIM = 32  # Dimensión de la proyección aleatoria
+SIMILARITY_OVERSAMPLING = 20  # Candidatos por vecino pedido antes de reordenar
+SIMILARITY_RADIUS_SLACK = 1.5  # Margen del radio en el espacio proyectado
+
+# Alineación de Procrustes (src/alineacion.py)
+GPA_MAX_ITERATIONS = 10  # Iteraciones máximas de estimación de la forma media
+GPA_TOLERANCE = 1e-6  # Cambio relativo de la media para dar por convergido
+GPA_CHUNK_SIZE = 16384  # Rostros por bloque al alinear datasets grandes
+# Marco canónico de align_faces (cada rostro se alinea por separado):
+# línea de los ojos horizontal, distancia entre esquinas externas de los
+# ojos fija (la de un rostro de retrato típico en coordenadas normalizadas)
+# y centroide en el centro de la imagen.
+ALIGN_EYE_DISTANCE = 0.25
+ALIGN_CENTER = (0.5, 0.5, 0.0)
+
+# Exportación de video anotado (src/video.py)
+VIDEO_QUEUE_SIZE = 2  # Frames máximos en cada cola entre etapas del pipeline
+VIDEO_FOURCC = "mp4v"  # Códec de cv2.VideoWriter
+
+# Arnés de regresión velocidad vs. precisión (src/regresion.py)
+REGRESSION_FIXTURES_DIR = os.path.join(PROJECT_DIR, "fixtures", "regresion")
+REGRESSION_REFERENCE_PROFILE = "accurate"  # Perfil que genera los resultados golden
+REGRESSION_MAX_VIDEO_FRAMES = 150  # Frames por video de fixture
+
+# Procesamiento de varias imágenes (src/lote.py)
+BATCH_WORKERS = min(4, os.cpu_count() or 1)  # Hilos (y detectores) simultáneos
+BATCH_PENDING_PER_WORKER = 2  # Imágenes en vuelo por hilo (acota la memoria)
+BATCH_ZIP_MAX_MEMORY = 32 * 1024 * 1024  # Bytes del ZIP en memoria antes de pasar a disco
+
+# Perfiles de rendimiento
+# Cada perfil define todo lo que afecta velocidad vs. precisión del pipeline:
+#   ancho_maximo: resolución de trabajo (las imágenes más anchas se reducen)
+#   max_num_faces / confianzas: parámetros de MediaPipe Face Mesh
+#   refine_landmarks: refinamiento de iris (478 puntos en lugar de 468)
+#   modo_seguimiento: en video, reutiliza el rostro del frame anterior
+#       (static_image_mode=False); las imágenes sueltas nunca lo usan
+#   nivel_detalle: se dibuja 1 de cada N puntos en los estilos por puntos
+#   decimales_exportacion / escala_secuencia: precisión de JSON/CSV y de .lmsq
+PERFILES = {
+    "realtime": {
+        "ancho_maximo": 480,
+        "max_num_faces": 1,
+        "refine_landmarks": False,
+        "modo_seguimiento": True,
+        "min_detection_confidence": 0.5,
+        "min_tracking_confidence": 0.5,
+        "nivel_detalle": 3,
+        "decimales_exportacion": 4,
+        "escala_secuencia": 4096
+    },
+    "balanced": {
+        "ancho_maximo": 800,
+        "max_num_faces": 5,
+        "refine_landmarks": True,
+        "modo_seguimiento": False,
+        "min_detection_confidence": 0.5,
+        "min_tracking_confidence": 0.5,
+        "nivel_detalle": 1,
+        "decimales_exportacion": 6,
+        "escala_secuencia": SEQUENCE_QUANT_SCALE
+    },
+    "accurate": {
+        "ancho_maximo": 1600,
+        "max_num_faces": 5,
+        "refine_landmarks": True,
+        "modo_seguimiento": False,
+        "min_detection_confidence": 0.7,
+        "min_tracking_confidence": 0.7,
+        "nivel_detalle": 1,
+        "decimales_exportacion": 8,
+        "escala_secuencia": SEQUENCE_QUANT_SCALE
+    }
+}
+PERFIL_POR_DEFECTO = "balanced"
+PERFIL_ENV = "LANDMARKS_PROFILE"  # Variable de entorno para elegir perfil
+
+
+def get_profile(nombre=None):
+    """
+    Devuelve un perfil de rendimiento.
+
+    Args:
+        nombre (str, optional): Nombre del perfil. Si None, se resuelve con
+            resolve_profile_name (CLI, variable de entorno o por defecto).
+
+    Returns:
+        dict: Copia del perfil con su nombre en la clave "nombre"
+    """
+    if nombre is None:
+        nombre = resolve_profile_name()
+    if nombre not in PERFILES:
+        raise ValueError(f"Perfil desconocido: {nombre}. Opciones: {', '.join(PERFILES)}")
+
+    perfil = dict(PERFILES[nombre])
+    perfil["nombre"] = nombre
+    return perfil
+
+
+def get_landmark_count(perfil=None):
+    """
+    Landmarks por rostro que produce un perfil.
+
+    Args:
+        perfil (str | dict, optional): Perfil de rendimiento
+
+    Returns:
+        int: TOTAL_LANDMARKS con refinamiento de iris, LANDMARKS_SIN_IRIS sin él
+    """
+    if not isinstance(perfil, dict):
+        perfil = get_profile(perfil)
+    return TOTAL_LANDMARKS if perfil["refine_landmarks"] else LANDMARKS_SIN_IRIS
+
+
+def resolve_profile_name(argv=None):
+    """
+    Resuelve el perfil pedido al iniciar: argumento --perfil de la línea de
+    comandos (con Streamlit: streamlit run app.py -- --perfil realtime),
+    luego la variable de entorno LANDMARKS_PROFILE y por último el valor
+    por defecto.
+
+    Args:
+        argv (list, optional): Argumentos a analizar. Si None, sys.argv[1:].
+
+    Returns:
+        str: Nombre del perfil
+
+    Raises:
+        ValueError: Si el perfil pedido por CLI o entorno no existe
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--perfil", "--profile", dest="perfil")
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+
+    # Un valor inválido es un error en ambos orígenes: caer en silencio al
+    # perfil por defecto ocultaría un error de configuración
+    for origen, valor in (("--perfil", args.perfil), (PERFIL_ENV, os.environ.get(PERFIL_ENV))):
+        nombre = (valor or "").strip().lower()
+        if not nombre:
+            continue
+        if nombre not in PERFILES:
+            raise ValueError(
+                f"Perfil desconocido en {origen}: {valor}. Opciones: {', '.join(PERFILES)}"
+            )
+        return nombre
+
+    return PERFIL_POR_DEFECTO
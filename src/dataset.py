@@ -0,0 +1,373 @@
+# src/dataset.py
+"""
+Almacén de datasets de landmarks en shards memory-mapped.
+
+Estructura del directorio:
+    - manifest.json: checkpoint con la cantidad de rostros confirmados
+    - shard_NNNNN.landmarks: float32 (capacidad, landmarks, 3) via np.memmap
+    - shard_NNNNN.meta: arreglo estructurado con métricas por rostro
+    - fuentes.txt: rutas de origen, una por línea (referenciadas por fuente_id)
+
+La ingesta es solo de agregado: los datos se escriben en los shards y
+recién al hacer checkpoint se actualiza el manifiesto de forma atómica.
+Si el proceso se interrumpe, al reabrir se descarta todo lo posterior al
+último checkpoint.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from .config import DATASET_SHARD_SIZE, DATASET_CHECKPOINT_EVERY, get_landmark_count
+from .exportacion import landmarks_to_array
+from .expresiones import EXPRESIONES
+
+VERSION = 1
+MANIFEST = "manifest.json"
+FUENTES = "fuentes.txt"
+
+# Metadatos por rostro. expresion es el índice en EXPRESIONES (-1 si no se
+# analizó) y las métricas quedan en NaN en ese caso.
+META_DTYPE = np.dtype([
+    ("fuente_id", "<i4"),
+    ("alto", "<i4"),
+    ("ancho", "<i4"),
+    ("rostro_idx", "<i2"),
+    ("expresion", "<i1"),
+    ("apertura_boca", "<f4"),
+    ("apertura_ojo_izquierdo", "<f4"),
+    ("apertura_ojo_derecho", "<f4"),
+    ("apertura_ojos", "<f4"),
+    ("inclinacion_cabeza", "<f4")
+])
+
+
+def _escribir_atomico(path, contenido):
+    """Escribe un archivo de texto de forma atómica (tmp + fsync + rename)."""
+    temporal = path + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(contenido)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, path)
+
+
+class LandmarkDatasetStore:
+    """
+    Almacén de landmarks con acceso aleatorio y recorridos vectorizados.
+    """
+
+    def __init__(self, directorio, capacidad_shard=DATASET_SHARD_SIZE,
+                 num_landmarks=None,
+                 checkpoint_cada=DATASET_CHECKPOINT_EVERY, solo_lectura=False,
+                 perfil=None):
+        """
+        Abre un almacén existente o crea uno nuevo.
+
+        Args:
+            directorio (str): Directorio del almacén
+            capacidad_shard (int): Rostros por shard (solo al crear)
+            num_landmarks (int, optional): Landmarks por rostro (solo al
+                crear). Si None, los que produce el perfil (478 con iris, 468 sin)
+            checkpoint_cada (int): Rostros entre checkpoints automáticos
+            solo_lectura (bool): Abrir sin permitir ingesta
+            perfil (str | dict, optional): Perfil de rendimiento de la
+                detección (solo al crear y sin num_landmarks)
+        """
+        self.directorio = directorio
+        self.checkpoint_cada = checkpoint_cada
+        self.solo_lectura = solo_lectura
+
+        manifest_path = os.path.join(directorio, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["version"] != VERSION:
+                raise ValueError(f"Versión de almacén no soportada: {manifest['version']}")
+        elif solo_lectura:
+            raise FileNotFoundError(f"No existe un almacén en {directorio}")
+        else:
+            os.makedirs(directorio, exist_ok=True)
+            if num_landmarks is None:
+                num_landmarks = get_landmark_count(perfil)
+            manifest = {
+                "version": VERSION,
+                "num_landmarks": num_landmarks,
+                "capacidad_shard": capacidad_shard,
+                "total": 0,
+                "bytes_fuentes": 0,
+                "total_fuentes": 0
+            }
+            self._guardar_manifest(manifest)
+
+        self.num_landmarks = manifest["num_landmarks"]
+        self.capacidad_shard = manifest["capacidad_shard"]
+        self._confirmados = manifest["total"]
+        self._total = self._confirmados
+        self._total_fuentes = manifest["total_fuentes"]
+        self._shards = []
+        self._rutas = None  # Cache de fuentes.txt para lecturas
+        self._ultima_fuente = (None, -1)
+
+        # Descartar lo escrito después del último checkpoint
+        fuentes_path = os.path.join(directorio, FUENTES)
+        if solo_lectura:
+            self._fuentes = None
+        else:
+            self._fuentes = open(fuentes_path, "ab")
+            self._fuentes.truncate(manifest["bytes_fuentes"])
+            self._fuentes.seek(manifest["bytes_fuentes"])
+
+        n_shards = -(-self._confirmados // self.capacidad_shard)
+        for shard in range(n_shards):
+            self._abrir_shard(shard)
+
+    def _guardar_manifest(self, manifest):
+        manifest["actualizado"] = datetime.now().isoformat()
+        _escribir_atomico(os.path.join(self.directorio, MANIFEST),
+                          json.dumps(manifest, indent=2))
+
+    def _abrir_shard(self, shard):
+        """Abre (o crea, si no existe) el par de memmaps de un shard."""
+        base = os.path.join(self.directorio, f"shard_{shard:05d}")
+        existe = os.path.exists(base + ".landmarks")
+        if self.solo_lectura:
+            modo = "r"
+        else:
+            modo = "r+" if existe else "w+"
+
+        landmarks = np.memmap(base + ".landmarks", dtype=np.float32, mode=modo,
+                              shape=(self.capacidad_shard, self.num_landmarks, 3))
+        meta = np.memmap(base + ".meta", dtype=META_DTYPE, mode=modo,
+                         shape=(self.capacidad_shard,))
+        self._shards.append((landmarks, meta))
+
+    def __len__(self):
+        return self._total
+
+    def _id_fuente(self, fuente):
+        """Registra la ruta de origen (reutiliza la última si coincide)."""
+        if self._ultima_fuente[0] == fuente:
+            return self._ultima_fuente[1]
+
+        linea = str(fuente).replace("\n", " ") + "\n"
+        self._fuentes.write(linea.encode("utf-8"))
+        fuente_id = self._total_fuentes
+        self._total_fuentes += 1
+        self._ultima_fuente = (fuente, fuente_id)
+        if self._rutas is not None:
+            self._rutas.append(str(fuente))
+        return fuente_id
+
+    def append(self, face, fuente, alto, ancho, rostro_idx=0, expresion_data=None):
+        """
+        Agrega un rostro al almacén.
+
+        Args:
+            face: NormalizedLandmarkList de MediaPipe o ndarray (landmarks, 3)
+            fuente (str): Ruta o identificador de la imagen de origen
+            alto (int): Alto de la imagen
+            ancho (int): Ancho de la imagen
+            rostro_idx (int): Índice del rostro dentro de la imagen
+            expresion_data (dict, optional): Resultado de analizar_expresion_basica
+
+        Returns:
+            int: Índice global del rostro agregado
+        """
+        if self.solo_lectura:
+            raise ValueError("El almacén está abierto en modo solo lectura")
+
+        coords = landmarks_to_array(face)
+        if coords.shape != (1, self.num_landmarks, 3):
+            raise ValueError(
+                f"Se esperaba un rostro de {self.num_landmarks} landmarks, "
+                f"se recibió un arreglo {coords.shape}"
+            )
+
+        indice = self._total
+        shard, fila = divmod(indice, self.capacidad_shard)
+        if shard == len(self._shards):
+            self._abrir_shard(shard)
+        landmarks, meta = self._shards[shard]
+
+        landmarks[fila] = coords[0]
+        registro = meta[fila]
+        registro["fuente_id"] = self._id_fuente(fuente)
+        registro["alto"] = alto
+        registro["ancho"] = ancho
+        registro["rostro_idx"] = rostro_idx
+
+        if expresion_data:
+            ojos = expresion_data["apertura_ojos"]
+            registro["expresion"] = EXPRESIONES.index(expresion_data["expresion_detectada"])
+            registro["apertura_boca"] = expresion_data["apertura_boca"]
+            registro["apertura_ojo_izquierdo"] = ojos["izquierdo"]
+            registro["apertura_ojo_derecho"] = ojos["derecho"]
+            registro["apertura_ojos"] = ojos["promedio"]
+            registro["inclinacion_cabeza"] = expresion_data["inclinacion_cabeza"]
+        else:
+            registro["expresion"] = -1
+            for campo in META_DTYPE.names[5:]:
+                registro[campo] = np.nan
+
+        self._total += 1
+        if self._total - self._confirmados >= self.checkpoint_cada:
+            self.checkpoint()
+
+        return indice
+
+    def append_image(self, landmarks, fuente, alto, ancho, analyzer=None):
+        """
+        Agrega todos los rostros detectados en una imagen.
+
+        Args:
+            landmarks: Lista de NormalizedLandmarkList de MediaPipe
+            fuente (str): Ruta de la imagen
+            alto (int): Alto de la imagen
+            ancho (int): Ancho de la imagen
+            analyzer (FacialExpressionAnalyzer, optional): Si se indica, se
+                guardan las métricas de expresión de cada rostro
+
+        Returns:
+            list: Índices globales de los rostros agregados
+        """
+        indices = []
+        for rostro_idx, face in enumerate(landmarks or []):
+            expresion_data = None
+            if analyzer is not None:
+                expresion_data = analyzer.analizar_expresion_basica(face, alto, ancho)
+            indices.append(self.append(face, fuente, alto, ancho,
+                                       rostro_idx, expresion_data))
+        return indices
+
+    def checkpoint(self):
+        """
+        Confirma en disco todo lo agregado hasta ahora.
+        Primero se sincronizan los datos y recién después el manifiesto.
+        """
+        if self.solo_lectura or self._total == self._confirmados:
+            return
+
+        # Solo los shards escritos desde el último checkpoint: el que estaba
+        # en curso y los que se abrieron después
+        primero = self._confirmados // self.capacidad_shard
+        ultimo = (self._total - 1) // self.capacidad_shard
+        for landmarks, meta in self._shards[primero:ultimo + 1]:
+            landmarks.flush()
+            meta.flush()
+        self._fuentes.flush()
+        os.fsync(self._fuentes.fileno())
+
+        self._guardar_manifest({
+            "version": VERSION,
+            "num_landmarks": self.num_landmarks,
+            "capacidad_shard": self.capacidad_shard,
+            "total": self._total,
+            "bytes_fuentes": self._fuentes.tell(),
+            "total_fuentes": self._total_fuentes
+        })
+        self._confirmados = self._total
+
+    def close(self):
+        """Hace checkpoint y libera los memmaps."""
+        self.checkpoint()
+        if self._fuentes is not None:
+            self._fuentes.close()
+            self._fuentes = None
+        self._shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def source(self, fuente_id):
+        """
+        Devuelve la ruta de origen registrada con fuente_id.
+
+        Args:
+            fuente_id (int): Identificador de fuente (columna fuente_id)
+
+        Returns:
+            str: Ruta de la imagen de origen
+        """
+        if self._rutas is None:
+            if self._fuentes is not None:
+                self._fuentes.flush()
+            with open(os.path.join(self.directorio, FUENTES), encoding="utf-8",
+                      newline="") as f:
+                self._rutas = f.read().split("\n")[:self._total_fuentes]
+        return self._rutas[fuente_id]
+
+    def __getitem__(self, indice):
+        """
+        Acceso aleatorio a un rostro.
+
+        Returns:
+            tuple: (landmarks ndarray (landmarks, 3), metadatos dict)
+        """
+        if indice < 0:
+            indice += self._total
+        if not 0 <= indice < self._total:
+            raise IndexError(f"Rostro fuera de rango: {indice}")
+
+        shard, fila = divmod(indice, self.capacidad_shard)
+        landmarks, meta = self._shards[shard]
+        registro = {nombre: meta[fila][nombre].item() for nombre in META_DTYPE.names}
+        registro["fuente"] = self.source(registro["fuente_id"])
+        codigo = registro["expresion"]
+        registro["expresion"] = EXPRESIONES[codigo] if codigo >= 0 else None
+        return np.array(landmarks[fila]), registro
+
+    def get_landmarks(self, indices):
+        """
+        Lee varios rostros por índice global de forma vectorizada.
+
+        Args:
+            indices (array-like): Índices globales
+
+        Returns:
+            numpy.ndarray: float32 (len(indices), landmarks, 3)
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.size and (indices.min() < 0 or indices.max() >= self._total):
+            raise IndexError("Índices de rostro fuera de rango")
+
+        resultado = np.empty((indices.size, self.num_landmarks, 3), dtype=np.float32)
+        shards, filas = np.divmod(indices, self.capacidad_shard)
+        for shard in np.unique(shards):
+            seleccion = shards == shard
+            resultado[seleccion] = self._shards[shard][0][filas[seleccion]]
+        return resultado
+
+    def iter_shards(self):
+        """
+        Recorre el almacén shard por shard sin copiar datos.
+
+        Yields:
+            tuple: (inicio, landmarks memmap (n, landmarks, 3), meta memmap (n,))
+        """
+        for shard, (landmarks, meta) in enumerate(self._shards):
+            inicio = shard * self.capacidad_shard
+            n = min(self.capacidad_shard, self._total - inicio)
+            if n <= 0:
+                break
+            yield inicio, landmarks[:n], meta[:n]
+
+    def column(self, nombre):
+        """
+        Concatena una columna de metadatos de todo el almacén.
+
+        Args:
+            nombre (str): Campo de META_DTYPE (por ejemplo "apertura_boca")
+
+        Returns:
+            numpy.ndarray: Valores de la columna para todos los rostros
+        """
+        partes = [meta[nombre] for _, _, meta in self.iter_shards()]
+        if not partes:
+            return np.zeros(0, dtype=META_DTYPE[nombre])
+        return np.concatenate(partes)
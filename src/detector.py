@@ -1,12 +1,17 @@
 # src/detector.py
 """
 Detector de landmarks faciales usando MediaPipe Face Mesh.
+
+MediaPipe y OpenCV se importan recién al crear o usar un detector, para
+que importar este módulo no cueste nada al arrancar la aplicación.
 """
 
-import cv2
-import mediapipe as mp
-import numpy as np
-from .config import LANDMARK_COLOR, LANDMARK_RADIUS, LANDMARK_THICKNESS
+import queue
+import threading
+from contextlib import contextmanager
+
+from . import arranque
+from .config import LANDMARK_COLOR, LANDMARK_RADIUS, LANDMARK_THICKNESS, get_profile
 
 
 class FaceLandmarkDetector:
@@ -15,22 +20,42 @@ class FaceLandmarkDetector:
     Detecta 478 landmarks por rostro con alta precisión.
     """
 
-    def __init__(self):
-        """Inicializa el detector de MediaPipe."""
+    def __init__(self, perfil=None, seguimiento=False):
+        """
+        Inicializa el detector de MediaPipe.
+
+        Args:
+            perfil (str | dict, optional): Perfil de rendimiento (ver
+                config.PERFILES). Si None, se usa el perfil activo.
+            seguimiento (bool): Reutilizar el rostro de la imagen anterior
+                (static_image_mode=False). Solo tiene sentido con frames
+                consecutivos de un mismo video; con imágenes sueltas cada
+                una debe detectarse desde cero.
+        """
+        import mediapipe as mp
+
+        if not isinstance(perfil, dict):
+            perfil = get_profile(perfil)
+        self.perfil = perfil
+
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=True,
-            max_num_faces=5,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
+            static_image_mode=not seguimiento,
+            max_num_faces=perfil["max_num_faces"],
+            refine_landmarks=perfil["refine_landmarks"],
+            min_detection_confidence=perfil["min_detection_confidence"],
+            min_tracking_confidence=perfil["min_tracking_confidence"]
         )
 
-    def detect(self, image):
+    def detect(self, image, dibujar_preview=True):
         """
         Detecta landmarks faciales usando MediaPipe Face Mesh.
 
         Args:
             image (numpy.ndarray): Imagen en formato BGR (OpenCV)
+            dibujar_preview (bool): Dibujar los puntos sobre una copia. Con
+                False se devuelve la imagen original sin copiarla (útil
+                cuando el dibujo lo hace FaceLandmarkVisualizer).
 
         Returns:
             tuple: (imagen_procesada, landmarks, info)
@@ -38,8 +63,10 @@ class FaceLandmarkDetector:
                 - landmarks: lista de objetos landmarks de MediaPipe
                 - info: diccionario con información de detección
         """
+        import cv2
+
         # Crear copia para dibujar
-        imagen_con_puntos = image.copy()
+        imagen_con_puntos = image.copy() if dibujar_preview else image
 
         # Convertir a RGB para MediaPipe
         rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
@@ -50,7 +77,8 @@ class FaceLandmarkDetector:
         info = {
             "rostros_detectados": 0,
             "total_landmarks": 0,
-            "deteccion_exitosa": False
+            "deteccion_exitosa": False,
+            "perfil": self.perfil["nombre"]
         }
 
         landmarks = []
@@ -58,14 +86,20 @@ class FaceLandmarkDetector:
         if results.multi_face_landmarks:
             info["rostros_detectados"] = len(results.multi_face_landmarks)
             info["deteccion_exitosa"] = True
-            info["total_landmarks"] = len(results.multi_face_landmarks) * 478
+            # 478 puntos con refinamiento de iris, 468 sin él
+            info["total_landmarks"] = sum(
+                len(face.landmark) for face in results.multi_face_landmarks
+            )
 
             # Devolver los landmarks de MediaPipe directamente
             landmarks = results.multi_face_landmarks
 
-            # Dibujar landmarks básicos para preview
+            # Dibujar landmarks básicos para preview (1 de cada nivel_detalle)
+            paso = self.perfil["nivel_detalle"]
             for face_landmarks in results.multi_face_landmarks:
-                for landmark in face_landmarks.landmark:
+                if not dibujar_preview:
+                    break
+                for landmark in face_landmarks.landmark[::paso]:
                     x = int(landmark.x * image.shape[1])
                     y = int(landmark.y * image.shape[0])
                     cv2.circle(imagen_con_puntos, (x, y), LANDMARK_RADIUS,
@@ -75,4 +109,156 @@ class FaceLandmarkDetector:
 
     def close(self):
         """Libera recursos del detector."""
-        self.face_mesh.close()
\ No newline at end of file
+        self.face_mesh.close()
+
+
+class DetectorPool:
+    """
+    Pool de detectores ya inicializados para un perfil.
+    Cargar el modelo de MediaPipe es caro, así que los detectores se crean
+    a demanda (hasta `tamano`) y se reutilizan entre imágenes. Como se
+    comparten entre imágenes no relacionadas, siempre se crean sin
+    seguimiento (static_image_mode=True).
+    """
+
+    def __init__(self, perfil=None, tamano=1):
+        """
+        Args:
+            perfil (str | dict, optional): Perfil de rendimiento
+            tamano (int): Máximo de detectores simultáneos
+        """
+        self.perfil = perfil if isinstance(perfil, dict) else get_profile(perfil)
+        self.tamano = tamano
+        self._libres = queue.LifoQueue()
+        self._creados = 0
+        self._lock = threading.Lock()
+        self._precarga = None
+        self.error_precarga = None
+
+    def acquire(self, timeout=None):
+        """
+        Toma un detector libre, creando uno nuevo si hay lugar en el pool.
+
+        Args:
+            timeout (float, optional): Segundos a esperar si están todos en uso
+
+        Returns:
+            FaceLandmarkDetector: Detector de uso exclusivo hasta release()
+        """
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            crear = self._creados < self.tamano
+            if crear:
+                self._creados += 1
+        if crear:
+            try:
+                return FaceLandmarkDetector(self.perfil)
+            except Exception:
+                with self._lock:
+                    self._creados -= 1
+                raise
+
+        return self._libres.get(timeout=timeout)
+
+    def release(self, detector):
+        """Devuelve un detector al pool."""
+        self._libres.put(detector)
+
+    @contextmanager
+    def detector(self, timeout=None):
+        """
+        Context manager para usar un detector del pool.
+
+        Ejemplo:
+            with pool.detector() as detector:
+                imagen, landmarks, info = detector.detect(imagen)
+        """
+        detector = self.acquire(timeout)
+        try:
+            yield detector
+        finally:
+            self.release(detector)
+
+    def warm_up(self):
+        """
+        Precarga un detector en segundo plano: importa MediaPipe, construye
+        el grafo y procesa una imagen vacía para que la primera detección
+        real no pague la inicialización. Solo se lanza una vez por pool.
+        Si falla, el error queda en error_precarga (y en el reporte de
+        arranque) en lugar de perderse en el hilo.
+
+        Returns:
+            threading.Thread: Hilo de precarga (join() para esperarlo)
+        """
+        with self._lock:
+            if self._precarga is not None:
+                return self._precarga
+            self._precarga = threading.Thread(
+                target=self._precargar,
+                name=f"precarga-{self.perfil['nombre']}",
+                daemon=True
+            )
+            self._precarga.start()
+        return self._precarga
+
+    def _precargar(self):
+        nombre = f"precarga_modelo_{self.perfil['nombre']}"
+        try:
+            import numpy as np
+
+            with arranque.medir(nombre):
+                with self.detector() as detector:
+                    detector.detect(np.zeros((64, 64, 3), dtype=np.uint8),
+                                    dibujar_preview=False)
+        except Exception as error:
+            self.error_precarga = error
+            arranque.registrar_error(nombre, error)
+
+    def resize(self, tamano):
+        """Permite crear más detectores (nunca reduce los ya creados)."""
+        with self._lock:
+            self.tamano = max(self.tamano, tamano)
+
+    def close(self):
+        """Cierra los detectores libres."""
+        while True:
+            try:
+                self._libres.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._creados = 0
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_detector_pool(perfil=None, tamano=1):
+    """
+    Devuelve el pool de detectores del perfil, creándolo la primera vez.
+    Hay un pool por nombre de perfil, compartido por todo el proceso
+    (en Streamlit sobrevive entre reejecuciones del script).
+
+    Args:
+        perfil (str | dict, optional): Perfil de rendimiento
+        tamano (int): Detectores mínimos que debe admitir el pool
+
+    Returns:
+        DetectorPool: Pool del perfil
+    """
+    if not isinstance(perfil, dict):
+        perfil = get_profile(perfil)
+
+    with _POOLS_LOCK:
+        pool = _POOLS.get(perfil["nombre"])
+        if pool is None:
+            pool = DetectorPool(perfil, tamano)
+            _POOLS[perfil["nombre"]] = pool
+        else:
+            pool.resize(tamano)
+    return pool
@@ -7,44 +7,157 @@ import json
 import csv
 from datetime import datetime
 
+import numpy as np
 
-def landmarks_to_dict(landmarks, alto, ancho):
+from .config import TOTAL_LANDMARKS
+
+
+def iter_landmark_rows(landmarks, alto, ancho, alineados=None, decimales=None):
     """
-    Convierte landmarks a formato diccionario para exportación.
-    Soporta listas de objetos NormalizedLandmarkList de MediaPipe.
+    Genera un diccionario por landmark sin armar la lista completa
+    (lo usan los exportadores en streaming).
 
     Args:
         landmarks: Lista de objetos NormalizedLandmarkList de MediaPipe
         alto (int): Alto de la imagen
         ancho (int): Ancho de la imagen
+        alineados (numpy.ndarray, optional): Formas alineadas (rostros, landmarks, 3)
+            de src.alineacion. Si se indican, se agregan x/y/z_alineado.
+        decimales (int, optional): Redondeo de las coordenadas normalizadas
+            (precisión de exportación del perfil). Si None, sin redondeo.
 
-    Returns:
-        list: Lista de diccionarios con datos de cada landmark
+    Yields:
+        dict: Datos de cada landmark
     """
-    data = []
+    def redondear(valor):
+        valor = float(valor)
+        return valor if decimales is None else round(valor, decimales)
 
     if not landmarks:
-        return data
+        return
 
     # Procesar cada rostro detectado
     for rostro_idx, face_landmarks in enumerate(landmarks):
         # Procesar cada landmark del rostro
         for landmark_idx, landmark in enumerate(face_landmarks.landmark):
-            data.append({
+            fila = {
                 "rostro_id": rostro_idx,
                 "landmark_id": landmark_idx,
                 "x": int(landmark.x * ancho),
                 "y": int(landmark.y * alto),
-                "z": landmark.z,
-                "x_normalizado": landmark.x,
-                "y_normalizado": landmark.y,
+                "z": redondear(landmark.z),
+                "x_normalizado": redondear(landmark.x),
+                "y_normalizado": redondear(landmark.y),
                 "visibilidad": getattr(landmark, 'visibility', 1.0)
-            })
+            }
+            if alineados is not None:
+                x_al, y_al, z_al = alineados[rostro_idx, landmark_idx]
+                fila.update({
+                    "x_alineado": redondear(x_al),
+                    "y_alineado": redondear(y_al),
+                    "z_alineado": redondear(z_al)
+                })
+            yield fila
+
+
+def landmarks_to_dict(landmarks, alto, ancho, alineados=None, decimales=None):
+    """
+    Convierte landmarks a formato diccionario para exportación.
+    Soporta listas de objetos NormalizedLandmarkList de MediaPipe.
+
+    Args:
+        landmarks: Lista de objetos NormalizedLandmarkList de MediaPipe
+        alto (int): Alto de la imagen
+        ancho (int): Ancho de la imagen
+        alineados (numpy.ndarray, optional): Formas alineadas (rostros, landmarks, 3)
+            de src.alineacion. Si se indican, se agregan x/y/z_alineado.
+        decimales (int, optional): Redondeo de las coordenadas normalizadas
+            (precisión de exportación del perfil). Si None, sin redondeo.
+
+    Returns:
+        list: Lista de diccionarios con datos de cada landmark
+    """
+    return list(iter_landmark_rows(landmarks, alto, ancho, alineados, decimales))
+
+
+def _landmarks_metadata(landmarks, alto, ancho, alineados, decimales):
+    """Metadatos comunes de las exportaciones JSON de landmarks."""
+    landmarks = landmarks or []
+    total_landmarks = sum(len(face.landmark) for face in landmarks)
+    # 478 puntos con refinamiento de iris, 468 sin él
+    por_rostro = len(landmarks[0].landmark) if landmarks else TOTAL_LANDMARKS
+    return {
+        "export_timestamp": datetime.now().isoformat(),
+        "total_landmarks": total_landmarks,
+        "image_dimensions": {
+            "width": ancho,
+            "height": alto
+        },
+        "landmark_format": f"MediaPipe Face Mesh {por_rostro} points",
+        "alineacion": "canonica" if alineados is not None else None,
+        "decimales": decimales
+    }
+
+
+def _csv_header(alineados):
+    header = "rostro_id,landmark_id,x,y,z,x_normalizado,y_normalizado,visibilidad"
+    if alineados is not None:
+        header += ",x_alineado,y_alineado,z_alineado"
+    return header
+
+
+def _csv_line(landmark, decimales, alineados):
+    campos = [
+        str(landmark["rostro_id"]),
+        str(landmark["landmark_id"]),
+        f"{landmark['x']:.4f}",
+        f"{landmark['y']:.4f}",
+        f"{landmark['z']:.{decimales}f}",
+        f"{landmark['x_normalizado']:.{decimales}f}",
+        f"{landmark['y_normalizado']:.{decimales}f}",
+        f"{landmark['visibilidad']:.3f}"
+    ]
+    if alineados is not None:
+        campos.extend(f"{landmark[k]:.{decimales}f}" for k in ("x_alineado", "y_alineado", "z_alineado"))
+    return ",".join(campos)
+
+
+def landmarks_to_array(landmarks):
+    """
+    Convierte landmarks a un arreglo numpy de coordenadas normalizadas.
+    Acepta listas de NormalizedLandmarkList de MediaPipe, un único rostro
+    o un arreglo ya convertido.
+
+    Args:
+        landmarks: Lista de objetos NormalizedLandmarkList de MediaPipe o ndarray
+
+    Returns:
+        numpy.ndarray: Arreglo float32 de forma (rostros, 478, 3) con (x, y, z)
+    """
+    if landmarks is None:
+        return np.zeros((0, 0, 3), dtype=np.float32)
+
+    if isinstance(landmarks, np.ndarray):
+        array = np.asarray(landmarks, dtype=np.float32)
+        if array.ndim == 2:
+            array = array[np.newaxis]
+        return array
+
+    # Un único rostro de MediaPipe
+    if hasattr(landmarks, "landmark"):
+        landmarks = [landmarks]
+
+    if len(landmarks) == 0:
+        return np.zeros((0, 0, 3), dtype=np.float32)
 
-    return data
+    return np.array(
+        [[(lm.x, lm.y, lm.z) for lm in face.landmark] for face in landmarks],
+        dtype=np.float32
+    )
 
 
-def export_landmarks_json(landmarks, alto, ancho, filename=None):
+def export_landmarks_json(landmarks, alto, ancho, filename=None, alineados=None,
+                          decimales=None):
     """
     Exporta landmarks a formato JSON.
 
@@ -53,6 +166,8 @@ def export_landmarks_json(landmarks, alto, ancho, filename=None):
         alto (int): Alto de la imagen
         ancho (int): Ancho de la imagen
         filename (str, optional): Nombre del archivo. Si None, genera uno automático.
+        alineados (numpy.ndarray, optional): Formas alineadas a incluir
+        decimales (int, optional): Decimales de las coordenadas normalizadas
 
     Returns:
         tuple: (json_string, filename)
@@ -61,19 +176,11 @@ def export_landmarks_json(landmarks, alto, ancho, filename=None):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"landmarks_{timestamp}.json"
 
-    data = landmarks_to_dict(landmarks, alto, ancho)
+    data = landmarks_to_dict(landmarks, alto, ancho, alineados, decimales)
 
     # Agregar metadatos
     export_data = {
-        "metadata": {
-            "export_timestamp": datetime.now().isoformat(),
-            "total_landmarks": len(data),
-            "image_dimensions": {
-                "width": ancho,
-                "height": alto
-            },
-            "landmark_format": "MediaPipe Face Mesh 478 points"
-        },
+        "metadata": _landmarks_metadata(landmarks, alto, ancho, alineados, decimales),
         "landmarks": data
     }
 
@@ -81,7 +188,8 @@ def export_landmarks_json(landmarks, alto, ancho, filename=None):
     return json_string, filename
 
 
-def export_landmarks_csv(landmarks, alto, ancho, filename=None):
+def export_landmarks_csv(landmarks, alto, ancho, filename=None, alineados=None,
+                         decimales=6):
     """
     Exporta landmarks a formato CSV.
 
@@ -90,6 +198,8 @@ def export_landmarks_csv(landmarks, alto, ancho, filename=None):
         alto (int): Alto de la imagen
         ancho (int): Ancho de la imagen
         filename (str, optional): Nombre del archivo. Si None, genera uno automático.
+        alineados (numpy.ndarray, optional): Formas alineadas a incluir
+        decimales (int): Decimales de las coordenadas normalizadas
 
     Returns:
         tuple: (csv_string, filename)
@@ -98,23 +208,11 @@ def export_landmarks_csv(landmarks, alto, ancho, filename=None):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"landmarks_{timestamp}.csv"
 
-    data = landmarks_to_dict(landmarks, alto, ancho)
+    data = landmarks_to_dict(landmarks, alto, ancho, alineados)
 
     # Crear CSV en memoria
-    csv_lines = []
-    csv_lines.append("rostro_id,landmark_id,x,y,z,x_normalizado,y_normalizado,visibilidad")
-
-    for landmark in data:
-        csv_lines.append(",".join([
-            str(landmark["rostro_id"]),
-            str(landmark["landmark_id"]),
-            ".4f",
-            ".4f",
-            ".6f",
-            ".6f",
-            ".6f",
-            ".3f"
-        ]))
+    csv_lines = [_csv_header(alineados)]
+    csv_lines.extend(_csv_line(landmark, decimales, alineados) for landmark in data)
 
     csv_string = "\n".join(csv_lines)
     return csv_string, filename
@@ -147,6 +245,68 @@ def export_expressions_json(expression_data, filename=None):
     return json_string, filename
 
 
+def write_landmarks_json(stream, landmarks, alto, ancho, alineados=None, decimales=None):
+    """
+    Escribe el mismo contenido que export_landmarks_json directamente en un
+    stream de texto, un landmark por vez (sin armar el string completo).
+
+    Args:
+        stream: Archivo de texto abierto para escritura (por ejemplo una
+            entrada de zipfile envuelta en io.TextIOWrapper)
+        landmarks: Lista de objetos NormalizedLandmarkList de MediaPipe
+        alto (int): Alto de la imagen
+        ancho (int): Ancho de la imagen
+        alineados (numpy.ndarray, optional): Formas alineadas a incluir
+        decimales (int, optional): Decimales de las coordenadas normalizadas
+    """
+    metadata = _landmarks_metadata(landmarks, alto, ancho, alineados, decimales)
+
+    stream.write('{\n  "metadata": ')
+    stream.write(json.dumps(metadata, ensure_ascii=False))
+    stream.write(',\n  "landmarks": [')
+    for i, fila in enumerate(iter_landmark_rows(landmarks, alto, ancho, alineados, decimales)):
+        stream.write(",\n    " if i else "\n    ")
+        stream.write(json.dumps(fila, ensure_ascii=False))
+    stream.write("\n  ]\n}\n")
+
+
+def write_landmarks_csv(stream, landmarks, alto, ancho, alineados=None, decimales=6):
+    """
+    Escribe el mismo contenido que export_landmarks_csv directamente en un
+    stream de texto, una fila por vez.
+
+    Args:
+        stream: Archivo de texto abierto para escritura
+        landmarks: Lista de objetos NormalizedLandmarkList de MediaPipe
+        alto (int): Alto de la imagen
+        ancho (int): Ancho de la imagen
+        alineados (numpy.ndarray, optional): Formas alineadas a incluir
+        decimales (int): Decimales de las coordenadas normalizadas
+    """
+    stream.write(_csv_header(alineados))
+    for landmark in iter_landmark_rows(landmarks, alto, ancho, alineados):
+        stream.write("\n")
+        stream.write(_csv_line(landmark, decimales, alineados))
+
+
+def write_expressions_json(stream, expression_data):
+    """
+    Escribe el mismo contenido que export_expressions_json en un stream de texto.
+
+    Args:
+        stream: Archivo de texto abierto para escritura
+        expression_data (dict | list): Datos de expresiones del analizador
+    """
+    export_data = {
+        "metadata": {
+            "export_timestamp": datetime.now().isoformat(),
+            "analysis_type": "facial_expressions"
+        },
+        "expressions": expression_data
+    }
+    json.dump(export_data, stream, indent=2, ensure_ascii=False)
+
+
 def create_download_link(data, filename, mime_type, label):
     """
     Crea un botón de descarga para Streamlit.
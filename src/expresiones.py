@@ -5,6 +5,31 @@ Cálculo de métricas y análisis de expresiones faciales.
 
 import math
 
+import numpy as np
+
+# Clasificaciones posibles de analizar_expresion_basica (el orden define
+# el código numérico usado por el almacén de datasets)
+EXPRESIONES = ("neutral", "boca_abierta", "ojos_cerrados", "cabeza_inclinada")
+
+
+def _sin_landmarks(face_landmarks):
+    """Indica si no hay landmarks (None, lista vacía o arreglo vacío)."""
+    if isinstance(face_landmarks, np.ndarray):
+        return face_landmarks.size == 0
+    return not face_landmarks
+
+
+def _coordenadas(face_landmarks, indice):
+    """
+    Devuelve (x, y) normalizados de un landmark.
+    Acepta NormalizedLandmarkList de MediaPipe o un arreglo (landmarks, 3),
+    por ejemplo una forma alineada con src.alineacion.
+    """
+    if isinstance(face_landmarks, np.ndarray):
+        return float(face_landmarks[indice, 0]), float(face_landmarks[indice, 1])
+    landmark = face_landmarks.landmark[indice]
+    return landmark.x, landmark.y
+
 
 class FacialExpressionAnalyzer:
     """
@@ -24,23 +49,24 @@ class FacialExpressionAnalyzer:
         Calcula la apertura de la boca usando MediaPipe Face Mesh.
 
         Args:
-            face_landmarks: Objeto NormalizedLandmarkList de MediaPipe
+            face_landmarks: Objeto NormalizedLandmarkList de MediaPipe o
+                arreglo (landmarks, 3)
             alto (int): Alto de la imagen
             ancho (int): Ancho de la imagen
 
         Returns:
             float: Distancia normalizada entre labio superior e inferior
         """
-        if not face_landmarks:
+        if _sin_landmarks(face_landmarks):
             return 0.0
 
         # Landmarks de la boca en MediaPipe Face Mesh
         # 13: labio superior, 14: labio inferior
-        upper_lip = face_landmarks.landmark[13]
-        lower_lip = face_landmarks.landmark[14]
+        _, upper_lip_y = _coordenadas(face_landmarks, 13)
+        _, lower_lip_y = _coordenadas(face_landmarks, 14)
 
         # Calcular distancia vertical normalizada
-        apertura = abs(upper_lip.y - lower_lip.y)
+        apertura = abs(upper_lip_y - lower_lip_y)
         return apertura
 
     def calcular_apertura_ojos(self, face_landmarks, alto, ancho):
@@ -48,28 +74,29 @@ class FacialExpressionAnalyzer:
         Calcula la apertura de ambos ojos usando MediaPipe Face Mesh.
 
         Args:
-            face_landmarks: Objeto NormalizedLandmarkList de MediaPipe
+            face_landmarks: Objeto NormalizedLandmarkList de MediaPipe o
+                arreglo (landmarks, 3)
             alto (int): Alto de la imagen
             ancho (int): Ancho de la imagen
 
         Returns:
             dict: {'izquierdo': float, 'derecho': float, 'promedio': float}
         """
-        if not face_landmarks:
+        if _sin_landmarks(face_landmarks):
             return {'izquierdo': 0.0, 'derecho': 0.0, 'promedio': 0.0}
 
         # Landmarks de los ojos en MediaPipe Face Mesh
         # Ojo izquierdo: 159 (párpado superior), 145 (párpado inferior)
         # Ojo derecho: 386 (párpado superior), 374 (párpado inferior)
 
-        left_eye_upper = face_landmarks.landmark[159]
-        left_eye_lower = face_landmarks.landmark[145]
-        right_eye_upper = face_landmarks.landmark[386]
-        right_eye_lower = face_landmarks.landmark[374]
+        _, left_eye_upper_y = _coordenadas(face_landmarks, 159)
+        _, left_eye_lower_y = _coordenadas(face_landmarks, 145)
+        _, right_eye_upper_y = _coordenadas(face_landmarks, 386)
+        _, right_eye_lower_y = _coordenadas(face_landmarks, 374)
 
         # Calcular aperturas normalizadas
-        left_apertura = abs(left_eye_upper.y - left_eye_lower.y)
-        right_apertura = abs(right_eye_upper.y - right_eye_lower.y)
+        left_apertura = abs(left_eye_upper_y - left_eye_lower_y)
+        right_apertura = abs(right_eye_upper_y - right_eye_lower_y)
         promedio = (left_apertura + right_apertura) / 2
 
         return {
@@ -83,24 +110,25 @@ class FacialExpressionAnalyzer:
         Calcula la inclinación de la cabeza usando MediaPipe Face Mesh.
 
         Args:
-            face_landmarks: Objeto NormalizedLandmarkList de MediaPipe
+            face_landmarks: Objeto NormalizedLandmarkList de MediaPipe o
+                arreglo (landmarks, 3)
             alto (int): Alto de la imagen
             ancho (int): Ancho de la imagen
 
         Returns:
             float: Ángulo de inclinación en grados
         """
-        if not face_landmarks:
+        if _sin_landmarks(face_landmarks):
             return 0.0
 
         # Usar landmarks de los ojos para calcular inclinación
         # Ojo izquierdo: 33, Ojo derecho: 263
-        left_eye = face_landmarks.landmark[33]
-        right_eye = face_landmarks.landmark[263]
+        left_eye_x, left_eye_y = _coordenadas(face_landmarks, 33)
+        right_eye_x, right_eye_y = _coordenadas(face_landmarks, 263)
 
         # Calcular ángulo usando la línea entre los ojos
-        delta_y = right_eye.y - left_eye.y
-        delta_x = right_eye.x - left_eye.x
+        delta_y = right_eye_y - left_eye_y
+        delta_x = right_eye_x - left_eye_x
 
         # Ángulo en radianes, convertir a grados
         angulo_radianes = math.atan2(delta_y, delta_x)
@@ -108,7 +136,7 @@ class FacialExpressionAnalyzer:
 
         return angulo_grados
 
-    def analizar_expresion_basica(self, face_landmarks, alto, ancho):
+    def analizar_expresion_basica(self, face_landmarks, alto, ancho, forma_alineada=None):
         """
         Análisis básico de expresión facial usando MediaPipe Face Mesh.
 
@@ -116,12 +144,17 @@ class FacialExpressionAnalyzer:
             face_landmarks: Objeto NormalizedLandmarkList de MediaPipe
             alto (int): Alto de la imagen
             ancho (int): Ancho de la imagen
+            forma_alineada (numpy.ndarray, optional): Forma (landmarks, 3)
+                alineada con src.alineacion. Si se indica, las aperturas de
+                boca y ojos se miden sobre ella; la inclinación se sigue
+                midiendo sobre los landmarks originales (la alineación la elimina).
 
         Returns:
             dict: Diccionario con métricas de expresión
         """
-        apertura_boca = self.calcular_apertura_boca(face_landmarks, alto, ancho)
-        apertura_ojos = self.calcular_apertura_ojos(face_landmarks, alto, ancho)
+        forma = face_landmarks if forma_alineada is None else forma_alineada
+        apertura_boca = self.calcular_apertura_boca(forma, alto, ancho)
+        apertura_ojos = self.calcular_apertura_ojos(forma, alto, ancho)
         inclinacion_cabeza = self.calcular_inclinacion_cabeza(face_landmarks, alto, ancho)
 
         # Clasificación básica basada en métricas calculadas
@@ -139,6 +172,7 @@ class FacialExpressionAnalyzer:
             'apertura_boca': apertura_boca,
             'apertura_ojos': apertura_ojos,
             'inclinacion_cabeza': inclinacion_cabeza,
+            'forma_alineada': forma_alineada is not None,
             'metricas': {
                 'boca_abierta_umbral': 0.03,
                 'ojos_cerrados_umbral': 0.02,
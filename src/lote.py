@@ -0,0 +1,290 @@
+# src/lote.py
+"""
+Procesamiento de varias imágenes en paralelo con exportación a un único ZIP.
+
+Las imágenes se decodifican y detectan en un pool de hilos que comparte
+los detectores precargados de src.detector (uno por hilo). Los resultados
+se entregan a medida que terminan, y BatchZipWriter los escribe en el ZIP
+uno por uno, directamente sobre cada entrada comprimida, sin armar en
+memoria el JSON/CSV completo de cada imagen.
+
+El ZIP no es seguro entre hilos: conviene escribirlo desde el hilo que
+consume process_batch (en Streamlit, el del script).
+"""
+
+import csv
+import io
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .config import BATCH_WORKERS, BATCH_PENDING_PER_WORKER, get_profile
+from .detector import get_detector_pool
+from .exportacion import write_landmarks_json, write_landmarks_csv, write_expressions_json
+
+# Columnas de resumen.csv (una fila por rostro, o una por imagen sin rostros)
+COLUMNAS_RESUMEN = (
+    "indice", "archivo", "rostro_id", "expresion", "apertura_boca",
+    "apertura_ojos", "inclinacion_cabeza", "error"
+)
+
+
+def _abrir_imagen(origen):
+    """Decodifica una imagen (ruta, bytes o archivo) a BGR de OpenCV."""
+    from PIL import Image
+
+    from .utils import pil_to_cv2
+
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        origen = io.BytesIO(origen)
+    elif hasattr(origen, "seek"):
+        origen.seek(0)
+    with Image.open(origen) as imagen:
+        return pil_to_cv2(imagen)
+
+
+def _procesar(indice, nombre, origen, pool, analizar, alinear):
+    """
+    Procesa una imagen en un hilo del pool: decodifica, redimensiona al
+    ancho del perfil, detecta y analiza todos los rostros.
+
+    Cualquier error queda registrado en resultado["error"] en lugar de
+    propagarse, para que una imagen fallida no corte el lote.
+    """
+    resultado = {
+        "indice": indice,
+        "nombre": nombre,
+        "alto": 0,
+        "ancho": 0,
+        "landmarks": [],
+        "info": None,
+        "alineados": None,
+        "expresiones": [],
+        "error": None
+    }
+
+    try:
+        imagen = _abrir_imagen(origen)
+    except Exception as error:
+        # Incluye PIL.UnidentifiedImageError (OSError) y DecompressionBombError
+        resultado["error"] = f"No se pudo abrir la imagen: {error}"
+        return resultado
+
+    try:
+        resultado.update(_analizar(imagen, pool, analizar, alinear))
+    except Exception as error:
+        resultado["error"] = f"Error al procesar la imagen: {error}"
+    return resultado
+
+
+def _analizar(imagen, pool, analizar, alinear):
+    """Detección, alineación y análisis de expresiones de una imagen."""
+    from .utils import resize_image
+
+    imagen = resize_image(imagen, max_width=pool.perfil["ancho_maximo"])
+    alto, ancho = imagen.shape[:2]
+
+    with pool.detector() as detector:
+        _, landmarks, info = detector.detect(imagen, dibujar_preview=False)
+    landmarks = list(landmarks)
+
+    alineados = None
+    if alinear and landmarks:
+        from .alineacion import align_faces
+        alineados = align_faces(landmarks, alto, ancho)
+
+    expresiones = []
+    if analizar and landmarks:
+        from .expresiones import FacialExpressionAnalyzer
+        analyzer = FacialExpressionAnalyzer()
+        for rostro_idx, face_landmarks in enumerate(landmarks):
+            datos = analyzer.analizar_expresion_basica(
+                face_landmarks, alto, ancho,
+                forma_alineada=alineados[rostro_idx] if alineados is not None else None
+            )
+            datos["rostro_id"] = rostro_idx
+            expresiones.append(datos)
+
+    return {
+        "alto": alto,
+        "ancho": ancho,
+        "landmarks": landmarks,
+        "info": info,
+        "alineados": alineados,
+        "expresiones": expresiones
+    }
+
+
+def process_batch(archivos, perfil=None, workers=BATCH_WORKERS, analizar=True,
+                  alinear=False, pendientes_por_hilo=BATCH_PENDING_PER_WORKER):
+    """
+    Procesa varias imágenes en paralelo y entrega cada resultado apenas
+    termina (no en el orden de entrada; usar "indice" para ordenarlos).
+
+    A lo sumo workers * pendientes_por_hilo imágenes están en vuelo a la
+    vez, así la memoria no crece con la cantidad de archivos.
+
+    Args:
+        archivos: Iterable de pares (nombre, origen); origen puede ser una
+            ruta, bytes o un archivo abierto (por ejemplo un UploadedFile)
+        perfil (str | dict, optional): Perfil de rendimiento
+        workers (int): Hilos de procesamiento (y detectores del pool)
+        analizar (bool): Analizar la expresión de cada rostro
+        alinear (bool): Alinear cada rostro al marco canónico (align_faces)
+        pendientes_por_hilo (int): Imágenes encoladas por hilo
+
+    Yields:
+        dict: Resultado por imagen con indice, nombre, alto, ancho,
+            landmarks, info, alineados, expresiones (una por rostro) y
+            error (None si se procesó bien)
+    """
+    if not isinstance(perfil, dict):
+        perfil = get_profile(perfil)
+    workers = max(1, workers)
+    pool = get_detector_pool(perfil, tamano=workers)
+    limite = workers * max(1, pendientes_por_hilo)
+
+    archivos = iter(enumerate(archivos))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lote") as executor:
+        pendientes = set()
+        agotados = False
+        while pendientes or not agotados:
+            while not agotados and len(pendientes) < limite:
+                siguiente = next(archivos, None)
+                if siguiente is None:
+                    agotados = True
+                    break
+                indice, (nombre, origen) = siguiente
+                pendientes.add(executor.submit(_procesar, indice, nombre, origen,
+                                               pool, analizar, alinear))
+            if not pendientes:
+                break
+
+            listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                yield futuro.result()
+
+
+class BatchZipWriter:
+    """
+    Escribe los resultados de process_batch en un único ZIP, entrada por
+    entrada. Cada imagen tiene su carpeta con landmarks (JSON o CSV) y,
+    si se analizaron, expresiones.json; al cerrar se agrega resumen.csv.
+    """
+
+    def __init__(self, destino, formato="JSON", decimales=None,
+                 compresion=zipfile.ZIP_DEFLATED):
+        """
+        Args:
+            destino (str | file): Ruta o archivo binario abierto para escritura
+            formato (str): "JSON" o "CSV" para los landmarks
+            decimales (int, optional): Decimales de las coordenadas
+                normalizadas (decimales_exportacion del perfil)
+            compresion (int): Método de compresión de zipfile
+        """
+        formato = formato.upper()
+        if formato not in ("JSON", "CSV"):
+            raise ValueError(f"Formato de exportación desconocido: {formato}")
+
+        self.formato = formato
+        self.decimales = decimales
+        self._zip = zipfile.ZipFile(destino, "w", compression=compresion)
+        self._resumen = []
+        self._stats = {"imagenes": 0, "rostros": 0, "errores": 0}
+
+    def _entrada(self, nombre):
+        """Abre una entrada del ZIP como stream de texto UTF-8."""
+        return io.TextIOWrapper(self._zip.open(nombre, "w"), encoding="utf-8", newline="")
+
+    def add(self, resultado):
+        """
+        Agrega el resultado de una imagen al ZIP.
+
+        Args:
+            resultado (dict): Elemento entregado por process_batch
+
+        Returns:
+            str: Carpeta de la imagen dentro del ZIP
+        """
+        base = os.path.splitext(os.path.basename(resultado["nombre"]))[0] or "imagen"
+        carpeta = f"{resultado['indice']:04d}_{base}"
+        self._stats["imagenes"] += 1
+
+        if resultado["error"] is not None:
+            self._stats["errores"] += 1
+            self._resumen.append(self._fila(resultado, error=resultado["error"]))
+            return carpeta
+
+        landmarks = resultado["landmarks"]
+        alto, ancho = resultado["alto"], resultado["ancho"]
+        if landmarks:
+            extension = self.formato.lower()
+            with self._entrada(f"{carpeta}/landmarks.{extension}") as stream:
+                if self.formato == "JSON":
+                    write_landmarks_json(stream, landmarks, alto, ancho,
+                                         alineados=resultado["alineados"],
+                                         decimales=self.decimales)
+                else:
+                    write_landmarks_csv(stream, landmarks, alto, ancho,
+                                        alineados=resultado["alineados"],
+                                        decimales=6 if self.decimales is None else self.decimales)
+
+        if resultado["expresiones"]:
+            with self._entrada(f"{carpeta}/expresiones.json") as stream:
+                write_expressions_json(stream, resultado["expresiones"])
+
+        self._stats["rostros"] += len(landmarks)
+        if not landmarks:
+            self._resumen.append(self._fila(resultado, error="Sin rostros detectados"))
+        elif resultado["expresiones"]:
+            self._resumen.extend(self._fila(resultado, datos) for datos in resultado["expresiones"])
+        else:
+            self._resumen.extend(self._fila(resultado, {"rostro_id": i}) for i in range(len(landmarks)))
+        return carpeta
+
+    @staticmethod
+    def _fila(resultado, datos=None, error=""):
+        datos = datos or {}
+        ojos = datos.get("apertura_ojos")
+        return {
+            "indice": resultado["indice"],
+            "archivo": resultado["nombre"],
+            "rostro_id": datos.get("rostro_id", ""),
+            "expresion": datos.get("expresion_detectada", ""),
+            "apertura_boca": datos.get("apertura_boca", ""),
+            "apertura_ojos": ojos["promedio"] if ojos else "",
+            "inclinacion_cabeza": datos.get("inclinacion_cabeza", ""),
+            "error": error
+        }
+
+    def summary(self):
+        """
+        Devuelve las filas de resumen ordenadas por imagen y rostro.
+
+        Returns:
+            list: Diccionarios con las columnas de COLUMNAS_RESUMEN
+        """
+        return sorted(self._resumen, key=lambda fila: (fila["indice"], fila["rostro_id"] if fila["rostro_id"] != "" else -1))
+
+    def close(self):
+        """
+        Escribe resumen.csv y cierra el ZIP.
+
+        Returns:
+            dict: Estadísticas (imagenes, rostros, errores)
+        """
+        if self._zip.fp is None:
+            return dict(self._stats)
+
+        with self._entrada("resumen.csv") as stream:
+            escritor = csv.DictWriter(stream, fieldnames=COLUMNAS_RESUMEN, lineterminator="\n")
+            escritor.writeheader()
+            escritor.writerows(self.summary())
+        self._zip.close()
+        return dict(self._stats)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,575 @@
+# src/regresion.py
+"""
+Arnés de regresión velocidad vs. precisión con fixtures golden.
+
+Estructura de los fixtures (por defecto fixtures/regresion/ en la raíz
+del proyecto):
+    imagenes/   imágenes fijas (jpg, jpeg, png)
+    videos/     videos cortos (mp4, mov, avi, mkv)
+    golden/     resultados de referencia generados con "generar"
+
+El repositorio trae un conjunto fijo de fotos reales (derivadas de
+imágenes de dominio público y CC0, ver el README), dos sin rostros y un
+video corto, junto con sus golden ya generados. Se puede completar con
+imágenes y videos propios; después hay que volver a correr "generar".
+
+El comando "generar" procesa los fixtures con el perfil de referencia y
+guarda landmarks y expresiones. El comando "evaluar" corre cada perfil de
+detección y cada modo de exportación, y los compara contra los golden:
+error por landmark en píxeles, acuerdo de analizar_expresion_basica y
+aceleración medida respecto de la referencia.
+
+Uso:
+    python -m src.regresion generar [--fixtures DIR]
+    python -m src.regresion evaluar [--fixtures DIR] [--salida reporte.json]
+
+Los golden se generan solo a pedido: "evaluar" falla si no existen, para
+no comparar un perfil contra resultados recién calculados en la misma
+máquina sin que nadie los haya revisado.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .config import (
+    PERFILES,
+    REGRESSION_FIXTURES_DIR,
+    REGRESSION_REFERENCE_PROFILE,
+    REGRESSION_MAX_VIDEO_FRAMES,
+    get_profile
+)
+from .alineacion import align_faces
+from .exportacion import landmarks_to_array, export_landmarks_json, export_landmarks_csv
+from .expresiones import FacialExpressionAnalyzer
+from .secuencias import LandmarkSequenceWriter, LandmarkSequenceReader
+
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png")
+EXTENSIONES_VIDEO = (".mp4", ".mov", ".avi", ".mkv")
+GOLDEN_JSON = "golden.json"
+GOLDEN_NPZ = "landmarks.npz"
+
+# Modos de exportación evaluados sobre la salida del perfil de referencia.
+# El primero es la base de comparación de velocidad y tamaño.
+MODOS_EXPORTACION = (
+    ("json", {"formato": "json", "decimales": None}),
+    ("json_d6", {"formato": "json", "decimales": 6}),
+    ("json_d4", {"formato": "json", "decimales": 4}),
+    ("csv_d6", {"formato": "csv", "decimales": 6}),
+    ("csv_d4", {"formato": "csv", "decimales": 4}),
+    ("secuencia_e16384", {"formato": "secuencia", "escala": 16384}),
+    ("secuencia_e4096", {"formato": "secuencia", "escala": 4096}),
+    ("alineado", {"formato": "alineado"})
+)
+
+
+def iter_fixtures(directorio, max_frames_video=REGRESSION_MAX_VIDEO_FRAMES):
+    """
+    Recorre los fixtures en orden estable.
+
+    Args:
+        directorio (str): Directorio de fixtures
+        max_frames_video (int): Frames a leer de cada video
+
+    Yields:
+        tuple: (grupo, item_id, imagen BGR). Las imágenes comparten el grupo
+            "imagenes"; cada video es su propio grupo y sus frames se
+            identifican como "video.mp4#00012".
+    """
+    import cv2
+
+    carpeta = os.path.join(directorio, "imagenes")
+    if os.path.isdir(carpeta):
+        for nombre in sorted(os.listdir(carpeta)):
+            if nombre.lower().endswith(EXTENSIONES_IMAGEN):
+                imagen = cv2.imread(os.path.join(carpeta, nombre))
+                if imagen is not None:
+                    yield "imagenes", nombre, imagen
+
+    carpeta = os.path.join(directorio, "videos")
+    if os.path.isdir(carpeta):
+        for nombre in sorted(os.listdir(carpeta)):
+            if not nombre.lower().endswith(EXTENSIONES_VIDEO):
+                continue
+            captura = cv2.VideoCapture(os.path.join(carpeta, nombre))
+            try:
+                for frame_idx in range(max_frames_video):
+                    ok, frame = captura.read()
+                    if not ok:
+                        break
+                    yield nombre, f"{nombre}#{frame_idx:05d}", frame
+            finally:
+                captura.release()
+
+
+def run_detector(perfil, directorio, max_frames_video=REGRESSION_MAX_VIDEO_FRAMES):
+    """
+    Procesa todos los fixtures con un perfil de detección.
+    Se usa un detector nuevo por grupo (cada video empieza sin seguimiento);
+    las imágenes sueltas nunca usan seguimiento y los videos lo usan si el
+    perfil lo indica, igual que en src/video.py. Solo se cronometra el
+    redimensionado y la detección.
+
+    Args:
+        perfil (str | dict): Perfil de rendimiento
+        directorio (str): Directorio de fixtures
+        max_frames_video (int): Frames a leer de cada video
+
+    Returns:
+        tuple: (resultados, segundos) con resultados = {item_id: {"landmarks":
+            lista de MediaPipe, "alto": int, "ancho": int}}
+    """
+    from .detector import FaceLandmarkDetector
+    from .utils import resize_image
+
+    if not isinstance(perfil, dict):
+        perfil = get_profile(perfil)
+
+    resultados = {}
+    segundos = 0.0
+    grupo_actual = None
+    detector = None
+
+    try:
+        for grupo, item_id, imagen in iter_fixtures(directorio, max_frames_video):
+            if grupo != grupo_actual:
+                if detector is not None:
+                    detector.close()
+                seguimiento = grupo != "imagenes" and perfil["modo_seguimiento"]
+                detector = FaceLandmarkDetector(perfil, seguimiento=seguimiento)
+                grupo_actual = grupo
+
+            inicio = time.perf_counter()
+            trabajo = resize_image(imagen, max_width=perfil["ancho_maximo"])
+            _, landmarks, _ = detector.detect(trabajo, dibujar_preview=False)
+            segundos += time.perf_counter() - inicio
+
+            # Las métricas en píxeles usan el tamaño original del fixture
+            resultados[item_id] = {
+                "landmarks": landmarks,
+                "alto": imagen.shape[0],
+                "ancho": imagen.shape[1]
+            }
+    finally:
+        if detector is not None:
+            detector.close()
+
+    return resultados, segundos
+
+
+def _expresiones(analyzer, coords, alto, ancho, alineados=None):
+    """Clasificación de analizar_expresion_basica para cada rostro."""
+    return [
+        analyzer.analizar_expresion_basica(
+            cara, alto, ancho,
+            forma_alineada=alineados[i] if alineados is not None else None
+        )["expresion_detectada"]
+        for i, cara in enumerate(coords)
+    ]
+
+
+def generate_golden(directorio=REGRESSION_FIXTURES_DIR,
+                    perfil=REGRESSION_REFERENCE_PROFILE,
+                    max_frames_video=REGRESSION_MAX_VIDEO_FRAMES):
+    """
+    Genera los resultados golden con el perfil de referencia.
+
+    Args:
+        directorio (str): Directorio de fixtures
+        perfil (str): Perfil de referencia
+        max_frames_video (int): Frames a leer de cada video
+
+    Returns:
+        int: Cantidad de items guardados
+    """
+    resultados, _ = run_detector(perfil, directorio, max_frames_video)
+    if not resultados:
+        raise ValueError(f"No hay fixtures en {directorio} (imagenes/ o videos/)")
+
+    analyzer = FacialExpressionAnalyzer()
+    arreglos = {}
+    items = {}
+    for item_id, resultado in resultados.items():
+        coords = landmarks_to_array(resultado["landmarks"])
+        arreglos[item_id] = coords
+        items[item_id] = {
+            "alto": resultado["alto"],
+            "ancho": resultado["ancho"],
+            "expresiones": _expresiones(analyzer, coords, resultado["alto"], resultado["ancho"])
+        }
+
+    destino = os.path.join(directorio, "golden")
+    os.makedirs(destino, exist_ok=True)
+    np.savez_compressed(os.path.join(destino, GOLDEN_NPZ), **arreglos)
+    with open(os.path.join(destino, GOLDEN_JSON), "w", encoding="utf-8") as f:
+        json.dump({
+            "creado": datetime.now().isoformat(),
+            "perfil_referencia": perfil,
+            "max_frames_video": max_frames_video,
+            "items": items
+        }, f, indent=2, ensure_ascii=False)
+
+    return len(items)
+
+
+def load_golden(directorio=REGRESSION_FIXTURES_DIR):
+    """
+    Carga los resultados golden.
+
+    Returns:
+        tuple: (metadatos dict, {item_id: ndarray (rostros, landmarks, 3)})
+
+    Raises:
+        FileNotFoundError: Si no hay golden en el directorio
+    """
+    destino = os.path.join(directorio, "golden")
+    for nombre in (GOLDEN_JSON, GOLDEN_NPZ):
+        if not os.path.exists(os.path.join(destino, nombre)):
+            raise FileNotFoundError(
+                f"No hay golden en {destino} (falta {nombre}); "
+                f"generarlos con: python -m src.regresion generar"
+            )
+    with open(os.path.join(destino, GOLDEN_JSON), encoding="utf-8") as f:
+        metadatos = json.load(f)
+    with np.load(os.path.join(destino, GOLDEN_NPZ)) as datos:
+        arreglos = {item_id: datos[item_id] for item_id in datos.files}
+    return metadatos, arreglos
+
+
+def _emparejar(golden, prediccion, alto, ancho):
+    """
+    Empareja rostros por cercanía de centroides (en píxeles), de a pares
+    del más cercano al más lejano.
+
+    Returns:
+        list: Pares (indice_golden, indice_prediccion)
+    """
+    if len(golden) == 0 or len(prediccion) == 0:
+        return []
+
+    escala = np.array([ancho, alto], dtype=np.float64)
+    centros_g = golden[:, :, :2].mean(axis=1) * escala
+    centros_p = prediccion[:, :, :2].mean(axis=1) * escala
+    distancias = np.linalg.norm(centros_g[:, None] - centros_p[None], axis=2)
+
+    pares = []
+    usados_g, usados_p = set(), set()
+    for plano in np.argsort(distancias, axis=None):
+        g, p = np.unravel_index(plano, distancias.shape)
+        if g not in usados_g and p not in usados_p:
+            pares.append((int(g), int(p)))
+            usados_g.add(g)
+            usados_p.add(p)
+    return pares
+
+
+def compare(golden_meta, golden, predicciones, alineado=False):
+    """
+    Compara predicciones contra los golden.
+
+    Args:
+        golden_meta (dict): Metadatos de load_golden
+        golden (dict): Arreglos golden por item
+        predicciones (dict): {item_id: ndarray (rostros, landmarks, 3)}
+        alineado (bool): Clasificar las expresiones sobre formas alineadas
+
+    Returns:
+        dict: Error por landmark (px), acuerdo de expresión y rostros perdidos
+    """
+    analyzer = FacialExpressionAnalyzer()
+    suma_por_landmark = None
+    cuenta_por_landmark = None
+    errores = []
+    coincidencias = 0
+    emparejados = 0
+    perdidos = 0
+    extra = 0
+
+    for item_id, meta in golden_meta["items"].items():
+        g = golden[item_id]
+        p = predicciones.get(item_id, np.zeros((0,) + g.shape[1:], dtype=np.float32))
+        alto, ancho = meta["alto"], meta["ancho"]
+
+        pares = _emparejar(g, p, alto, ancho)
+        perdidos += len(g) - len(pares)
+        extra += len(p) - len(pares)
+        if not pares:
+            continue
+
+        # Sin refinamiento de iris hay 468 puntos: se comparan los comunes
+        comunes = min(g.shape[1], p.shape[1])
+        ig = [a for a, _ in pares]
+        ip = [b for _, b in pares]
+        delta = (p[ip, :comunes, :2] - g[ig, :comunes, :2]) * np.array([ancho, alto])
+        error = np.linalg.norm(delta, axis=2)  # (pares, comunes) en píxeles
+
+        if suma_por_landmark is None or len(suma_por_landmark) < comunes:
+            previo_suma, previo_cuenta = suma_por_landmark, cuenta_por_landmark
+            suma_por_landmark = np.zeros(comunes)
+            cuenta_por_landmark = np.zeros(comunes)
+            if previo_suma is not None:
+                suma_por_landmark[:len(previo_suma)] = previo_suma
+                cuenta_por_landmark[:len(previo_cuenta)] = previo_cuenta
+        suma_por_landmark[:comunes] += error.sum(axis=0)
+        cuenta_por_landmark[:comunes] += len(pares)
+        errores.append(error.ravel())
+
+        alineados = align_faces(p[ip], alto, ancho) if alineado else None
+        etiquetas = _expresiones(analyzer, p[ip], alto, ancho, alineados)
+        coincidencias += sum(
+            etiqueta == meta["expresiones"][a] for etiqueta, a in zip(etiquetas, ig)
+        )
+        emparejados += len(pares)
+
+    rostros_golden = sum(len(meta["expresiones"]) for meta in golden_meta["items"].values())
+    resultado = {
+        "rostros_golden": rostros_golden,
+        "rostros_perdidos": perdidos,
+        "rostros_extra": extra,
+        "acuerdo_expresion": coincidencias / emparejados if emparejados else None,
+        "error_medio_px": None,
+        "error_p95_px": None,
+        "error_max_px": None,
+        "peores_landmarks": []
+    }
+    if errores:
+        todos = np.concatenate(errores)
+        por_landmark = suma_por_landmark / np.maximum(cuenta_por_landmark, 1)
+        peores = np.argsort(por_landmark)[::-1][:5]
+        resultado.update({
+            "error_medio_px": float(todos.mean()),
+            "error_p95_px": float(np.percentile(todos, 95)),
+            "error_max_px": float(todos.max()),
+            "error_por_landmark_px": por_landmark.tolist(),
+            "peores_landmarks": [(int(i), float(por_landmark[i])) for i in peores]
+        })
+    return resultado
+
+
+def _desde_json(texto):
+    """Reconstruye (rostros, landmarks, 3) desde export_landmarks_json."""
+    filas = json.loads(texto)["landmarks"]
+    if not filas:
+        return np.zeros((0, 0, 3), dtype=np.float32)
+    rostros = max(f["rostro_id"] for f in filas) + 1
+    puntos = max(f["landmark_id"] for f in filas) + 1
+    coords = np.zeros((rostros, puntos, 3), dtype=np.float32)
+    for f in filas:
+        coords[f["rostro_id"], f["landmark_id"]] = (f["x_normalizado"], f["y_normalizado"], f["z"])
+    return coords
+
+
+def _desde_csv(texto):
+    """Reconstruye (rostros, landmarks, 3) desde export_landmarks_csv."""
+    lineas = texto.split("\n")[1:]
+    if not lineas:
+        return np.zeros((0, 0, 3), dtype=np.float32)
+    tabla = np.array([linea.split(",")[:7] for linea in lineas], dtype=np.float64)
+    rostros = int(tabla[:, 0].max()) + 1
+    puntos = int(tabla[:, 1].max()) + 1
+    coords = np.zeros((rostros, puntos, 3), dtype=np.float32)
+    coords[tabla[:, 0].astype(int), tabla[:, 1].astype(int)] = tabla[:, [5, 6, 4]]
+    return coords
+
+
+def run_export_mode(opciones, resultados):
+    """
+    Exporta los resultados de la referencia con un modo y los vuelve a leer.
+
+    Args:
+        opciones (dict): Opciones del modo (ver MODOS_EXPORTACION)
+        resultados (dict): Salida de run_detector
+
+    Returns:
+        tuple: (predicciones {item_id: ndarray}, segundos de exportación, bytes)
+    """
+    predicciones = {}
+    segundos = 0.0
+    total_bytes = 0
+    formato = opciones["formato"]
+
+    if formato == "secuencia":
+        with tempfile.TemporaryDirectory() as temporal:
+            ruta = os.path.join(temporal, "regresion.lmsq")
+            escritor = None
+            ids = []
+            inicio = time.perf_counter()
+            for item_id, resultado in resultados.items():
+                coords = landmarks_to_array(resultado["landmarks"])
+                if escritor is None and coords.shape[0]:
+                    escritor = LandmarkSequenceWriter(ruta, escala=opciones["escala"],
+                                                      num_landmarks=coords.shape[1])
+                if escritor is not None and coords.shape[0]:
+                    escritor.write_frame(coords)
+                    ids.append(item_id)
+            if escritor is not None:
+                total_bytes = escritor.close()["bytes_archivo"]
+            segundos = time.perf_counter() - inicio
+            if escritor is not None:
+                with LandmarkSequenceReader(ruta) as lector:
+                    predicciones = dict(zip(ids, lector.read_frames(0)))
+        return predicciones, segundos, total_bytes
+
+    for item_id, resultado in resultados.items():
+        landmarks, alto, ancho = resultado["landmarks"], resultado["alto"], resultado["ancho"]
+        if formato == "alineado":
+            # Las coordenadas no cambian; se mide el costo de alinear
+            inicio = time.perf_counter()
+            align_faces(landmarks, alto, ancho)
+            segundos += time.perf_counter() - inicio
+            predicciones[item_id] = landmarks_to_array(landmarks)
+            continue
+
+        inicio = time.perf_counter()
+        if formato == "json":
+            texto, _ = export_landmarks_json(landmarks, alto, ancho, filename="regresion.json",
+                                             decimales=opciones["decimales"])
+        else:
+            texto, _ = export_landmarks_csv(landmarks, alto, ancho, filename="regresion.csv",
+                                            decimales=opciones["decimales"])
+        segundos += time.perf_counter() - inicio
+        total_bytes += len(texto.encode("utf-8"))
+        predicciones[item_id] = _desde_json(texto) if formato == "json" else _desde_csv(texto)
+
+    return predicciones, segundos, total_bytes
+
+
+def evaluate(directorio=REGRESSION_FIXTURES_DIR, perfiles=None, exportacion=True):
+    """
+    Corre todos los modos contra los golden y arma el reporte.
+
+    Args:
+        directorio (str): Directorio de fixtures (con golden/ generado)
+        perfiles (list, optional): Perfiles de detección a evaluar (todos si None)
+        exportacion (bool): Evaluar también los modos de exportación
+
+    Returns:
+        dict: {"referencia": str, "items": int, "modos": [filas del reporte]}
+    """
+    golden_meta, golden = load_golden(directorio)
+    referencia = golden_meta["perfil_referencia"]
+    max_frames = golden_meta["max_frames_video"]
+    n_items = len(golden_meta["items"])
+    filas = []
+
+    # La referencia se vuelve a correr para medir su tiempo en esta máquina
+    resultados_ref, segundos_ref = run_detector(referencia, directorio, max_frames)
+
+    for nombre in perfiles or list(PERFILES):
+        if nombre == referencia:
+            resultados, segundos = resultados_ref, segundos_ref
+        else:
+            resultados, segundos = run_detector(nombre, directorio, max_frames)
+        predicciones = {k: landmarks_to_array(v["landmarks"]) for k, v in resultados.items()}
+        fila = {
+            "modo": nombre,
+            "tipo": "detector",
+            "segundos": segundos,
+            "ms_por_item": 1000 * segundos / max(n_items, 1),
+            "speedup": segundos_ref / segundos if segundos else None,
+            "bytes": None
+        }
+        fila.update(compare(golden_meta, golden, predicciones))
+        filas.append(fila)
+
+    if exportacion:
+        base_segundos = base_bytes = None
+        for nombre, opciones in MODOS_EXPORTACION:
+            predicciones, segundos, total_bytes = run_export_mode(opciones, resultados_ref)
+            if base_segundos is None:
+                base_segundos, base_bytes = segundos, total_bytes
+            # "alineado" no exporta nada: su tiempo es el costo de alinear,
+            # que no es comparable con el de exportar JSON
+            comparable = opciones["formato"] != "alineado"
+            fila = {
+                "modo": nombre,
+                "tipo": "exportacion" if comparable else "alineacion",
+                "segundos": segundos,
+                "ms_por_item": 1000 * segundos / max(n_items, 1),
+                "speedup": base_segundos / segundos if segundos and comparable else None,
+                "bytes": total_bytes or None,
+                "reduccion_tamano": base_bytes / total_bytes if total_bytes and base_bytes else None
+            }
+            fila.update(compare(golden_meta, golden, predicciones,
+                                alineado=opciones["formato"] == "alineado"))
+            filas.append(fila)
+
+    return {"referencia": referencia, "items": n_items, "modos": filas}
+
+
+def format_report(reporte):
+    """
+    Tabla Markdown con precisión y velocidad lado a lado.
+
+    Args:
+        reporte (dict): Resultado de evaluate
+
+    Returns:
+        str: Reporte en Markdown
+    """
+    def numero(valor, formato):
+        return "-" if valor is None else format(valor, formato)
+
+    def veces(valor):
+        return "-" if valor is None else f"{valor:.2f}x"
+
+    lineas = [
+        f"Referencia: {reporte['referencia']} · items: {reporte['items']}",
+        "",
+        "| Modo | Tipo | ms/item | Speedup | Tamaño | Error medio (px) | p95 (px) | Máx (px) "
+        "| Acuerdo expresión | Perdidos/extra |",
+        "|------|------|---------|---------|--------|------------------|----------|----------"
+        "|-------------------|----------------|"
+    ]
+    for fila in reporte["modos"]:
+        acuerdo = fila["acuerdo_expresion"]
+        lineas.append(
+            f"| {fila['modo']} | {fila['tipo']} | {numero(fila['ms_por_item'], '.2f')} "
+            f"| {veces(fila['speedup'])} | {veces(fila.get('reduccion_tamano'))} "
+            f"| {numero(fila['error_medio_px'], '.3f')} | {numero(fila['error_p95_px'], '.3f')} "
+            f"| {numero(fila['error_max_px'], '.3f')} "
+            f"| {'-' if acuerdo is None else f'{acuerdo:.1%}'} "
+            f"| {fila['rostros_perdidos']}/{fila['rostros_extra']} |"
+        )
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Regresión velocidad vs. precisión de landmarks")
+    parser.add_argument("comando", choices=["generar", "evaluar"])
+    parser.add_argument("--fixtures", default=REGRESSION_FIXTURES_DIR)
+    parser.add_argument("--perfil-referencia", default=REGRESSION_REFERENCE_PROFILE,
+                        choices=list(PERFILES))
+    parser.add_argument("--perfiles", nargs="*", choices=list(PERFILES), default=None)
+    parser.add_argument("--max-frames", type=int, default=REGRESSION_MAX_VIDEO_FRAMES)
+    parser.add_argument("--sin-exportacion", action="store_true")
+    parser.add_argument("--salida", help="Guardar el reporte completo en JSON")
+    args = parser.parse_args(argv)
+
+    if args.comando == "generar":
+        total = generate_golden(args.fixtures, args.perfil_referencia, args.max_frames)
+        print(f"Golden generados: {total} items con el perfil {args.perfil_referencia}")
+        return 0
+
+    try:
+        reporte = evaluate(args.fixtures, args.perfiles, exportacion=not args.sin_exportacion)
+    except FileNotFoundError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(format_report(reporte))
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+# src/secuencias.py
+"""
+Formato compacto para secuencias de landmarks (resultados de video).
+
+Estructura del archivo:
+    - Cabecera: magic, versión y metadatos JSON (escala, landmarks, fps)
+    - Bloques: frames cuantizados a int16, codificados como diferencia
+      con el frame anterior y comprimidos con zlib
+    - Pie: índice de bloques (offset, tamaño, primer frame) y estadísticas
+      de compresión en JSON, seguido del offset del pie
+
+El índice permite leer cualquier rango de frames descomprimiendo solo
+los bloques que lo contienen.
+"""
+
+import json
+import struct
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from .config import (
+    TOTAL_LANDMARKS,
+    SEQUENCE_QUANT_SCALE,
+    SEQUENCE_CHUNK_FRAMES,
+    SEQUENCE_COMPRESSION_LEVEL
+)
+from .exportacion import landmarks_to_array
+
+MAGIC = b"LMSQ"
+MAGIC_PIE = b"LMSX"
+VERSION = 1
+
+_CABECERA = struct.Struct("<4sBI")  # magic, versión, largo del JSON
+_PIE = struct.Struct("<Q4s")        # offset del pie, magic final
+_BLOQUE = struct.Struct("<I")       # frames en el bloque
+
+_INT16_MIN = np.iinfo(np.int16).min
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+def _mezclar_bytes(valores):
+    """
+    Reordena int16 en planos por coordenada y por byte para que zlib
+    encuentre más repeticiones (los bytes altos de las diferencias son
+    casi siempre 0x00 o 0xFF).
+    """
+    planar = np.ascontiguousarray(valores.reshape(-1, 3).T)
+    return np.ascontiguousarray(planar.view(np.uint8).reshape(-1, 2).T).tobytes()
+
+
+def _desmezclar_bytes(buffer, total_valores):
+    """Operación inversa de _mezclar_bytes."""
+    planos = np.frombuffer(buffer, dtype=np.uint8, count=total_valores * 2)
+    planar = np.ascontiguousarray(planos.reshape(2, -1).T).view(np.int16)
+    return np.ascontiguousarray(planar.reshape(3, -1).T)
+
+
+def _con_tamano(stats, bytes_archivo):
+    """Agrega a las estadísticas el tamaño del archivo y el ratio de compresión."""
+    stats = dict(stats)
+    stats["bytes_archivo"] = bytes_archivo
+    stats["ratio_compresion"] = stats["bytes_float32"] / bytes_archivo if bytes_archivo else 0.0
+    return stats
+
+
+class LandmarkSequenceWriter:
+    """
+    Escritor en streaming de secuencias de landmarks.
+    Mantiene en memoria solo el bloque en construcción.
+    """
+
+    def __init__(self, path, escala=SEQUENCE_QUANT_SCALE,
+                 frames_por_bloque=SEQUENCE_CHUNK_FRAMES, fps=None,
+                 num_landmarks=TOTAL_LANDMARKS,
+                 nivel_compresion=SEQUENCE_COMPRESSION_LEVEL):
+        """
+        Abre el archivo y escribe la cabecera.
+
+        Args:
+            path (str): Ruta del archivo de salida
+            escala (int): Unidades int16 por unidad normalizada (precisión)
+            frames_por_bloque (int): Frames por bloque comprimido
+            fps (float, optional): Frame rate de la fuente
+            num_landmarks (int): Landmarks por rostro (478 con iris, 468 sin)
+            nivel_compresion (int): Nivel de zlib (0-9)
+        """
+        if escala <= 0:
+            raise ValueError("La escala de cuantización debe ser positiva")
+        if frames_por_bloque <= 0:
+            raise ValueError("frames_por_bloque debe ser positivo")
+
+        self.escala = escala
+        self.frames_por_bloque = frames_por_bloque
+        self.num_landmarks = num_landmarks
+        self.nivel_compresion = nivel_compresion
+
+        self._archivo = open(path, "wb")
+        self._indice = []
+        self._pendientes = []  # Frames cuantizados del bloque actual
+        self._anterior = None  # Último frame cuantizado (para diferencias)
+        self._total_frames = 0
+        self._total_rostros = 0
+        self._error_max = 0.0
+        self._error_suma = 0.0
+        self._recortados = 0
+        self._cerrado = False
+
+        metadatos = {
+            "num_landmarks": num_landmarks,
+            "escala": escala,
+            "frames_por_bloque": frames_por_bloque,
+            "fps": fps,
+            "creado": datetime.now().isoformat()
+        }
+        cabecera_json = json.dumps(metadatos).encode("utf-8")
+        self._archivo.write(_CABECERA.pack(MAGIC, VERSION, len(cabecera_json)))
+        self._archivo.write(cabecera_json)
+
+    def write_frame(self, landmarks):
+        """
+        Agrega un frame a la secuencia.
+
+        Args:
+            landmarks: Lista de NormalizedLandmarkList de MediaPipe o ndarray
+                (rostros, num_landmarks, 3). Vacío si no hay rostros.
+        """
+        if self._cerrado:
+            raise ValueError("El escritor de secuencias ya está cerrado")
+
+        coords = landmarks_to_array(landmarks)
+        if coords.shape[0] == 0:
+            coords = np.zeros((0, self.num_landmarks, 3), dtype=np.float32)
+        elif coords.shape[1:] != (self.num_landmarks, 3):
+            raise ValueError(
+                f"Se esperaban {self.num_landmarks} landmarks por rostro, "
+                f"se recibieron {coords.shape[1]}"
+            )
+
+        escalado = np.rint(coords.astype(np.float64) * self.escala)
+        cuantizado = np.clip(escalado, _INT16_MIN, _INT16_MAX).astype(np.int16)
+
+        if coords.size:
+            error = np.abs(coords - cuantizado.astype(np.float64) / self.escala)
+            self._error_max = max(self._error_max, float(error.max()))
+            self._error_suma += float(error.sum())
+            self._recortados += int(np.count_nonzero(escalado != cuantizado))
+
+        self._pendientes.append(cuantizado)
+        self._total_frames += 1
+        self._total_rostros += cuantizado.shape[0]
+
+        if len(self._pendientes) >= self.frames_por_bloque:
+            self._escribir_bloque()
+
+    def _escribir_bloque(self):
+        """Codifica, comprime y escribe el bloque pendiente."""
+        if not self._pendientes:
+            return
+
+        n_frames = len(self._pendientes)
+        conteos = np.array([f.shape[0] for f in self._pendientes], dtype=np.uint16)
+        claves = np.zeros(n_frames, dtype=np.uint8)
+        partes = []
+
+        # El primer frame de cada bloque es clave para permitir acceso aleatorio
+        anterior = None
+        for i, frame in enumerate(self._pendientes):
+            if anterior is None or anterior.shape != frame.shape:
+                claves[i] = 1
+                partes.append(frame.ravel())
+            else:
+                # Aritmética int16 con desborde: la suma inversa la recupera
+                partes.append((frame - anterior).ravel())
+            anterior = frame
+
+        datos = np.concatenate(partes) if partes else np.zeros(0, dtype=np.int16)
+        crudo = (_BLOQUE.pack(n_frames) + conteos.tobytes() + claves.tobytes()
+                 + _mezclar_bytes(datos))
+        comprimido = zlib.compress(crudo, self.nivel_compresion)
+
+        offset = self._archivo.tell()
+        self._archivo.write(comprimido)
+        self._indice.append([offset, len(comprimido),
+                             self._total_frames - n_frames, n_frames])
+        self._pendientes = []
+
+    def _stats_contenido(self):
+        """Estadísticas que no dependen del tamaño final (se guardan en el pie)."""
+        valores = self._total_rostros * self.num_landmarks * 3
+        return {
+            "frames": self._total_frames,
+            "rostros": self._total_rostros,
+            "bytes_float32": valores * 4,
+            "paso_cuantizacion": 1.0 / self.escala,
+            "error_max": self._error_max,
+            "error_medio": self._error_suma / valores if valores else 0.0,
+            "valores_recortados": self._recortados
+        }
+
+    def stats(self):
+        """
+        Estadísticas de compresión y pérdida de precisión hasta el momento.
+
+        Returns:
+            dict: Frames, rostros, tamaños, ratio de compresión y errores
+        """
+        bytes_archivo = self._archivo.tell() if not self._cerrado else self._bytes_finales
+        return _con_tamano(self._stats_contenido(), bytes_archivo)
+
+    def close(self):
+        """
+        Escribe el último bloque, el índice y cierra el archivo.
+
+        Returns:
+            dict: Estadísticas finales (ver stats)
+        """
+        if self._cerrado:
+            return self.stats()
+
+        self._escribir_bloque()
+        offset_pie = self._archivo.tell()
+        # El tamaño del archivo no se conoce hasta escribir el pie: el lector
+        # lo toma del archivo y recalcula el ratio
+        pie = {"indice": self._indice, "stats": self._stats_contenido()}
+        self._archivo.write(json.dumps(pie).encode("utf-8"))
+        self._archivo.write(_PIE.pack(offset_pie, MAGIC_PIE))
+        self._bytes_finales = self._archivo.tell()
+        self._archivo.close()
+        self._cerrado = True
+
+        return self.stats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class LandmarkSequenceReader:
+    """
+    Lector con acceso aleatorio de secuencias escritas por LandmarkSequenceWriter.
+    """
+
+    def __init__(self, path):
+        """
+        Abre el archivo y carga la cabecera y el índice de bloques.
+
+        Args:
+            path (str): Ruta del archivo de secuencia
+        """
+        self._archivo = open(path, "rb")
+
+        magic, version, largo = _CABECERA.unpack(self._archivo.read(_CABECERA.size))
+        if magic != MAGIC:
+            self._archivo.close()
+            raise ValueError(f"{path} no es un archivo de secuencia de landmarks")
+        if version != VERSION:
+            self._archivo.close()
+            raise ValueError(f"Versión de secuencia no soportada: {version}")
+
+        self.metadata = json.loads(self._archivo.read(largo).decode("utf-8"))
+        self.escala = self.metadata["escala"]
+        self.num_landmarks = self.metadata["num_landmarks"]
+        self.fps = self.metadata.get("fps")
+
+        self._archivo.seek(-_PIE.size, 2)
+        offset_pie, magic_pie = _PIE.unpack(self._archivo.read(_PIE.size))
+        if magic_pie != MAGIC_PIE:
+            self._archivo.close()
+            raise ValueError(f"{path} está incompleto (falta el índice de bloques)")
+
+        fin_pie = self._archivo.tell() - _PIE.size
+        self._archivo.seek(offset_pie)
+        pie = json.loads(self._archivo.read(fin_pie - offset_pie).decode("utf-8"))
+
+        self.stats = _con_tamano(pie["stats"], fin_pie + _PIE.size)
+        self._indice = np.array(pie["indice"], dtype=np.int64).reshape(-1, 4)
+        self._inicios = self._indice[:, 2]
+        self._cache = (None, None)  # (bloque, frames decodificados)
+
+    def __len__(self):
+        return int(self.stats["frames"])
+
+    def _leer_bloque(self, bloque):
+        """Descomprime y decodifica un bloque completo."""
+        if self._cache[0] == bloque:
+            return self._cache[1]
+
+        offset, largo, _, _ = self._indice[bloque]
+        self._archivo.seek(int(offset))
+        crudo = zlib.decompress(self._archivo.read(int(largo)))
+
+        (n_frames,) = _BLOQUE.unpack_from(crudo)
+        pos = _BLOQUE.size
+        conteos = np.frombuffer(crudo, dtype=np.uint16, count=n_frames, offset=pos)
+        pos += n_frames * 2
+        claves = np.frombuffer(crudo, dtype=np.uint8, count=n_frames, offset=pos)
+        pos += n_frames
+
+        por_rostro = self.num_landmarks * 3
+        total = int(conteos.sum()) * por_rostro
+        datos = _desmezclar_bytes(crudo[pos:], total).ravel()
+
+        frames = []
+        anterior = None
+        inicio = 0
+        for conteo, clave in zip(conteos, claves):
+            fin = inicio + int(conteo) * por_rostro
+            valores = datos[inicio:fin].reshape(int(conteo), self.num_landmarks, 3)
+            actual = valores.copy() if clave else anterior + valores
+            frames.append(actual)
+            anterior = actual
+            inicio = fin
+
+        decodificados = [f.astype(np.float32) / self.escala for f in frames]
+        self._cache = (bloque, decodificados)
+        return decodificados
+
+    def read_frames(self, inicio, fin=None):
+        """
+        Lee un rango de frames [inicio, fin).
+
+        Args:
+            inicio (int): Primer frame
+            fin (int, optional): Frame final exclusivo. Si None, hasta el final.
+
+        Returns:
+            list: Arreglos float32 (rostros, num_landmarks, 3) por frame
+        """
+        total = len(self)
+        fin = total if fin is None else min(fin, total)
+        if inicio < 0 or inicio > fin:
+            raise IndexError(f"Rango de frames inválido: [{inicio}, {fin})")
+
+        resultado = []
+        frame = inicio
+        while frame < fin:
+            bloque = int(np.searchsorted(self._inicios, frame, side="right")) - 1
+            decodificados = self._leer_bloque(bloque)
+            primero = int(self._inicios[bloque])
+            hasta = min(fin, primero + len(decodificados))
+            resultado.extend(decodificados[frame - primero:hasta - primero])
+            frame = hasta
+
+        return resultado
+
+    def __getitem__(self, indice):
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError(f"Frame fuera de rango: {indice}")
+        return self.read_frames(indice, indice + 1)[0]
+
+    def iter_frames(self):
+        """Itera todos los frames decodificando un bloque por vez."""
+        for bloque in range(len(self._indice)):
+            yield from self._leer_bloque(bloque)
+
+    def close(self):
+        """Cierra el archivo."""
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,380 @@
+# src/similitud.py
+"""
+Índice de búsqueda por similitud de forma sobre landmarks normalizados.
+
+Cada rostro se centra y se escala a norma unitaria, de modo que la
+distancia euclídea compara la forma (expresión y pose) y no la posición
+ni el tamaño en la imagen. Con el tamaño de la imagen, las coordenadas
+se pasan antes al espacio isótropo (alineacion.to_isotropic): así el
+mismo rostro da el mismo vector en una imagen 4:3 y en una 16:9.
+
+Para conjuntos chicos se usa fuerza bruta exacta. Para conjuntos grandes
+se proyecta cada forma a pocas dimensiones con una matriz aleatoria
+(Johnson-Lindenstrauss), se buscan candidatos en ese espacio y se
+reordenan con la distancia exacta.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .config import (
+    SIMILARITY_APPROX_THRESHOLD,
+    SIMILARITY_PROJECTION_DIM,
+    SIMILARITY_OVERSAMPLING,
+    SIMILARITY_RADIUS_SLACK
+)
+from .alineacion import to_isotropic
+from .exportacion import landmarks_to_array
+
+METODOS = ("auto", "exacto", "proyeccion")
+_LOTE_CONSULTAS = 64  # Consultas por multiplicación en la búsqueda exacta
+
+
+def normalize_shapes(shapes, alto=None, ancho=None):
+    """
+    Centra y escala cada forma a norma unitaria.
+
+    Args:
+        shapes: Landmarks de MediaPipe o ndarray (N, landmarks, 3)
+        alto (int | array-like, optional): Alto de la imagen (o uno por forma)
+        ancho (int | array-like, optional): Ancho de la imagen (o uno por forma).
+            Sin alto y ancho se asume que las coordenadas ya son isótropas
+            (imagen cuadrada o convertidas con to_isotropic).
+
+    Returns:
+        numpy.ndarray: float32 (N, landmarks * 3) con vectores de forma
+    """
+    coords = landmarks_to_array(shapes).astype(np.float32)
+    if alto is not None and ancho is not None:
+        coords = to_isotropic(coords, alto, ancho)
+    coords = coords - coords.mean(axis=1, keepdims=True)
+    planos = coords.reshape(coords.shape[0], -1)
+    normas = np.linalg.norm(planos, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return planos / normas
+
+
+class ShapeIndex:
+    """
+    Índice k-NN y por radio de formas faciales con inserciones incrementales.
+    """
+
+    def __init__(self, metodo="auto", dimension_proyeccion=SIMILARITY_PROJECTION_DIM,
+                 umbral_aproximado=SIMILARITY_APPROX_THRESHOLD, semilla=0):
+        """
+        Inicializa un índice vacío.
+
+        Args:
+            metodo (str): "exacto", "proyeccion" o "auto" (según el tamaño)
+            dimension_proyeccion (int): Dimensiones de la proyección aleatoria
+            umbral_aproximado (int): Formas a partir de las cuales "auto"
+                usa la proyección
+            semilla (int): Semilla de la matriz de proyección
+        """
+        if metodo not in METODOS:
+            raise ValueError(f"Método desconocido: {metodo}. Opciones: {METODOS}")
+
+        self.metodo = metodo
+        self.dimension_proyeccion = dimension_proyeccion
+        self.umbral_aproximado = umbral_aproximado
+        self.semilla = semilla
+
+        self._total = 0
+        self._vectores = None
+        self._normas2 = None
+        self._proyecciones = None
+        self._proy_normas2 = None
+        self._ids = None
+        self._matriz = None
+
+    def __len__(self):
+        return self._total
+
+    @property
+    def metodo_activo(self):
+        """Método efectivo de búsqueda según el tamaño actual."""
+        if self.metodo != "auto":
+            return self.metodo
+        return "proyeccion" if self._total >= self.umbral_aproximado else "exacto"
+
+    def _reservar(self, dimension, necesarios):
+        """Crea o agranda (duplicando) los buffers internos."""
+        if self._vectores is None:
+            rng = np.random.default_rng(self.semilla)
+            self._matriz = (rng.standard_normal((dimension, self.dimension_proyeccion))
+                            / np.sqrt(self.dimension_proyeccion)).astype(np.float32)
+            capacidad = max(necesarios, 1024)
+            self._vectores = np.empty((capacidad, dimension), dtype=np.float32)
+            self._normas2 = np.empty(capacidad, dtype=np.float32)
+            self._proyecciones = np.empty((capacidad, self.dimension_proyeccion),
+                                          dtype=np.float32)
+            self._proy_normas2 = np.empty(capacidad, dtype=np.float32)
+            self._ids = np.empty(capacidad, dtype=np.int64)
+            return
+
+        if dimension != self._vectores.shape[1]:
+            raise ValueError(
+                f"Dimensión de forma incompatible: {dimension} "
+                f"(el índice usa {self._vectores.shape[1]})"
+            )
+
+        # Los buffers cargados con memmap son de solo lectura: se copian al crecer
+        if necesarios <= self._vectores.shape[0] and self._vectores.flags.writeable:
+            return
+
+        capacidad = max(necesarios, 2 * self._vectores.shape[0])
+
+        def crecer(buffer):
+            nuevo = np.empty((capacidad,) + buffer.shape[1:], dtype=buffer.dtype)
+            nuevo[:self._total] = buffer[:self._total]
+            return nuevo
+
+        self._vectores = crecer(self._vectores)
+        self._normas2 = crecer(self._normas2)
+        self._proyecciones = crecer(self._proyecciones)
+        self._proy_normas2 = crecer(self._proy_normas2)
+        self._ids = crecer(self._ids)
+
+    def add(self, shapes, ids=None, normalizado=False, alto=None, ancho=None):
+        """
+        Inserta formas en el índice.
+
+        Args:
+            shapes: Landmarks de MediaPipe, ndarray (N, landmarks, 3) o,
+                con normalizado=True, vectores (N, D) de normalize_shapes
+            ids (array-like, optional): Identificadores (por ejemplo índices
+                de LandmarkDatasetStore). Si None, se usan posiciones.
+            normalizado (bool): Indica que shapes ya son vectores normalizados
+            alto, ancho (optional): Tamaño de la imagen de origen (o uno por
+                forma), ver normalize_shapes
+
+        Returns:
+            numpy.ndarray: Identificadores asignados
+        """
+        vectores = (np.asarray(shapes, dtype=np.float32) if normalizado
+                    else normalize_shapes(shapes, alto, ancho))
+        n = vectores.shape[0]
+        if ids is None:
+            ids = np.arange(self._total, self._total + n, dtype=np.int64)
+        else:
+            ids = np.asarray(ids, dtype=np.int64)
+            if ids.shape != (n,):
+                raise ValueError("Se necesita un id por forma")
+        if n == 0:
+            return ids
+
+        self._reservar(vectores.shape[1], self._total + n)
+        fin = self._total + n
+        proyectados = vectores @ self._matriz
+
+        self._vectores[self._total:fin] = vectores
+        self._normas2[self._total:fin] = np.einsum("ij,ij->i", vectores, vectores)
+        self._proyecciones[self._total:fin] = proyectados
+        self._proy_normas2[self._total:fin] = np.einsum("ij,ij->i", proyectados, proyectados)
+        self._ids[self._total:fin] = ids
+        self._total = fin
+
+        return ids
+
+    @classmethod
+    def from_dataset(cls, store, **kwargs):
+        """
+        Construye un índice con todos los rostros de un LandmarkDatasetStore.
+        Los ids del índice son los índices globales del almacén, y cada
+        rostro se corrige con el tamaño de imagen de sus metadatos.
+
+        Args:
+            store (LandmarkDatasetStore): Almacén de landmarks
+            **kwargs: Parámetros de ShapeIndex
+
+        Returns:
+            ShapeIndex: Índice con los rostros del almacén
+        """
+        indice = cls(**kwargs)
+        for inicio, landmarks, meta in store.iter_shards():
+            indice.add(landmarks, ids=np.arange(inicio, inicio + len(landmarks)),
+                       alto=meta["alto"], ancho=meta["ancho"])
+        return indice
+
+    def _consultas(self, query, normalizado, alto=None, ancho=None):
+        vectores = (np.asarray(query, dtype=np.float32) if normalizado
+                    else normalize_shapes(query, alto, ancho))
+        return vectores.reshape(-1, self._vectores.shape[1])
+
+    def _distancias(self, consultas, filas=None):
+        """Distancias exactas de cada consulta a todas las formas o a filas."""
+        if filas is None:
+            base = self._vectores[:self._total]
+            normas2 = self._normas2[:self._total]
+        else:
+            base = self._vectores[filas]
+            normas2 = self._normas2[filas]
+        d2 = (np.einsum("ij,ij->i", consultas, consultas)[:, None]
+              + normas2[None, :] - 2.0 * consultas @ base.T)
+        return np.sqrt(np.maximum(d2, 0.0))
+
+    def _distancias_proyectadas(self, consultas):
+        proyectadas = consultas @ self._matriz
+        d2 = (np.einsum("ij,ij->i", proyectadas, proyectadas)[:, None]
+              + self._proy_normas2[None, :self._total]
+              - 2.0 * proyectadas @ self._proyecciones[:self._total].T)
+        return np.sqrt(np.maximum(d2, 0.0))
+
+    def knn(self, query, k=5, normalizado=False, alto=None, ancho=None):
+        """
+        Busca las k formas más parecidas.
+
+        Args:
+            query: Uno o varios rostros (mismo formato que add)
+            k (int): Cantidad de vecinos
+            normalizado (bool): Indica que query ya está normalizada
+            alto, ancho (optional): Tamaño de la imagen de la consulta
+
+        Returns:
+            tuple: (ids, distancias), cada uno de forma (consultas, k)
+                ordenados de menor a mayor distancia
+        """
+        if k < 1:
+            raise ValueError(f"k debe ser al menos 1, se recibió {k}")
+        if self._total == 0:
+            raise ValueError("El índice está vacío")
+
+        consultas = self._consultas(query, normalizado, alto, ancho)
+        k = min(k, self._total)
+        ids = np.empty((consultas.shape[0], k), dtype=np.int64)
+        distancias = np.empty((consultas.shape[0], k), dtype=np.float32)
+
+        for inicio in range(0, consultas.shape[0], _LOTE_CONSULTAS):
+            lote = consultas[inicio:inicio + _LOTE_CONSULTAS]
+
+            if self.metodo_activo == "exacto":
+                d = self._distancias(lote)
+                filas = np.argpartition(d, k - 1, axis=1)[:, :k]
+                d = np.take_along_axis(d, filas, axis=1)
+            else:
+                m = min(self._total, k * SIMILARITY_OVERSAMPLING)
+                dp = self._distancias_proyectadas(lote)
+                candidatos = np.argpartition(dp, m - 1, axis=1)[:, :m]
+                filas = np.empty((len(lote), k), dtype=np.int64)
+                d = np.empty((len(lote), k), dtype=np.float32)
+                for i, (consulta, cand) in enumerate(zip(lote, candidatos)):
+                    cand = np.sort(cand)  # Lectura secuencial si el buffer es memmap
+                    exactas = self._distancias(consulta[None], cand)[0]
+                    mejores = np.argpartition(exactas, k - 1)[:k]
+                    filas[i] = cand[mejores]
+                    d[i] = exactas[mejores]
+
+            orden = np.argsort(d, axis=1)
+            ids[inicio:inicio + len(lote)] = self._ids[np.take_along_axis(filas, orden, axis=1)]
+            distancias[inicio:inicio + len(lote)] = np.take_along_axis(d, orden, axis=1)
+
+        return ids, distancias
+
+    def radius(self, query, radio, normalizado=False, alto=None, ancho=None):
+        """
+        Busca las formas a distancia menor o igual que radio.
+
+        Con el método exacto devuelve todas. Con la proyección el resultado
+        es aproximado: solo se verifican los candidatos a distancia
+        proyectada menor que radio * SIMILARITY_RADIUS_SLACK, así que
+        algunos vecinos verdaderos pueden faltar (nunca sobran).
+
+        Args:
+            query: Uno o varios rostros (mismo formato que add)
+            radio (float): Distancia máxima entre formas normalizadas
+            normalizado (bool): Indica que query ya está normalizada
+            alto, ancho (optional): Tamaño de la imagen de la consulta
+
+        Returns:
+            list: Por consulta, una tupla (ids, distancias) ordenada por distancia
+        """
+        if self._total == 0:
+            raise ValueError("El índice está vacío")
+
+        consultas = self._consultas(query, normalizado, alto, ancho)
+        resultados = []
+
+        for inicio in range(0, consultas.shape[0], _LOTE_CONSULTAS):
+            lote = consultas[inicio:inicio + _LOTE_CONSULTAS]
+
+            if self.metodo_activo == "exacto":
+                d = self._distancias(lote)
+                for fila_d in d:
+                    filas = np.flatnonzero(fila_d <= radio)
+                    resultados.append((filas, fila_d[filas]))
+            else:
+                dp = self._distancias_proyectadas(lote)
+                for consulta, fila_dp in zip(lote, dp):
+                    cand = np.flatnonzero(fila_dp <= radio * SIMILARITY_RADIUS_SLACK)
+                    exactas = self._distancias(consulta[None], cand)[0]
+                    dentro = exactas <= radio
+                    resultados.append((cand[dentro], exactas[dentro]))
+
+        ordenados = []
+        for filas, d in resultados:
+            orden = np.argsort(d)
+            ordenados.append((self._ids[filas[orden]], d[orden].astype(np.float32)))
+        return ordenados
+
+    def save(self, directorio):
+        """
+        Guarda el índice en un directorio (arreglos .npy y parámetros JSON).
+
+        Args:
+            directorio (str): Directorio de destino
+        """
+        os.makedirs(directorio, exist_ok=True)
+        params = {
+            "metodo": self.metodo,
+            "dimension_proyeccion": self.dimension_proyeccion,
+            "umbral_aproximado": self.umbral_aproximado,
+            "semilla": self.semilla,
+            "total": self._total
+        }
+        if self._total:
+            np.save(os.path.join(directorio, "vectores.npy"), self._vectores[:self._total])
+            np.save(os.path.join(directorio, "proyecciones.npy"),
+                    self._proyecciones[:self._total])
+            np.save(os.path.join(directorio, "ids.npy"), self._ids[:self._total])
+            np.save(os.path.join(directorio, "matriz.npy"), self._matriz)
+        with open(os.path.join(directorio, "indice.json"), "w", encoding="utf-8") as f:
+            json.dump(params, f, indent=2)
+
+    @classmethod
+    def load(cls, directorio, mmap=True):
+        """
+        Carga un índice guardado con save.
+
+        Args:
+            directorio (str): Directorio del índice
+            mmap (bool): Mapear los vectores completos en lugar de leerlos
+                (las proyecciones siempre se cargan en memoria)
+
+        Returns:
+            ShapeIndex: Índice cargado (admite nuevas inserciones)
+        """
+        with open(os.path.join(directorio, "indice.json"), encoding="utf-8") as f:
+            params = json.load(f)
+
+        total = params.pop("total")
+        indice = cls(**params)
+        if total == 0:
+            return indice
+
+        modo = "r" if mmap else None
+        indice._vectores = np.load(os.path.join(directorio, "vectores.npy"), mmap_mode=modo)
+        indice._proyecciones = np.load(os.path.join(directorio, "proyecciones.npy"))
+        indice._ids = np.load(os.path.join(directorio, "ids.npy"))
+        indice._matriz = np.load(os.path.join(directorio, "matriz.npy"))
+        indice._total = total
+
+        # Las normas se recalculan por bloques para no leer todo de una vez
+        indice._normas2 = np.empty(total, dtype=np.float32)
+        for inicio in range(0, total, 65536):
+            bloque = np.asarray(indice._vectores[inicio:inicio + 65536])
+            indice._normas2[inicio:inicio + len(bloque)] = np.einsum("ij,ij->i", bloque, bloque)
+        indice._proy_normas2 = np.einsum("ij,ij->i", indice._proyecciones,
+                                         indice._proyecciones)
+        return indice
@@ -1,12 +1,9 @@
 # src/utils.py
 """
 Funciones auxiliares para procesamiento de imágenes.
+OpenCV y PIL se importan dentro de cada función (carga diferida).
 """
 
-import cv2
-import numpy as np
-from PIL import Image
-
 
 def pil_to_cv2(pil_image):
     """
@@ -18,6 +15,9 @@ def pil_to_cv2(pil_image):
     Returns:
         numpy.ndarray: Imagen en formato OpenCV (BGR)
     """
+    import cv2
+    import numpy as np
+
     # Convertir PIL a RGB numpy array
     rgb_array = np.array(pil_image.convert('RGB'))
     # Convertir RGB a BGR (formato OpenCV)
@@ -35,6 +35,9 @@ def cv2_to_pil(cv2_image):
     Returns:
         PIL.Image: Imagen en formato PIL (RGB)
     """
+    import cv2
+    from PIL import Image
+
     # Convertir BGR a RGB
     rgb_array = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB)
     # Convertir a PIL
@@ -56,6 +59,8 @@ def resize_image(image, max_width=800):
     alto, ancho = image.shape[:2]
 
     if ancho > max_width:
+        import cv2
+
         ratio = max_width / ancho
         nuevo_ancho = max_width
         nuevo_alto = int(alto * ratio)
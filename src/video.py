@@ -0,0 +1,222 @@
+# src/video.py
+"""
+Exportación de video anotado con un pipeline de tres etapas.
+
+    decodificar (hilo) -> detectar + dibujar (hilo) -> codificar (llamador)
+
+Las etapas se conectan con colas acotadas, así que nunca hay más de unos
+pocos frames en memoria: 2 * tamano_cola en las colas más uno por etapa.
+La codificación corre en el hilo que llama, de modo que el callback de
+progreso puede actualizar la interfaz de Streamlit.
+OpenCV se importa al exportar (carga diferida).
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+
+from .config import VIDEO_QUEUE_SIZE, VIDEO_FOURCC, get_landmark_count, get_profile
+from .detector import FaceLandmarkDetector
+from .secuencias import LandmarkSequenceWriter
+from .utils import resize_image
+from .visualizacion import FaceLandmarkVisualizer
+
+_FIN = object()  # Marca de fin de stream entre etapas
+_ESPERA = 0.1  # Segundos entre chequeos de cancelación al esperar una cola
+
+
+def _memoria_mb():
+    """
+    Memoria residente actual del proceso en MB.
+    Usa /proc en Linux; en otros sistemas devuelve el pico (ru_maxrss).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en bytes en macOS y en KB en Linux
+    return pico / 2**20 if sys.platform == "darwin" else pico / 1024
+
+
+def _poner(cola, item, detener):
+    """Encola respetando la cancelación. Devuelve False si se canceló."""
+    while not detener.is_set():
+        try:
+            cola.put(item, timeout=_ESPERA)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _tomar(cola, detener):
+    """Desencola respetando la cancelación. Devuelve _FIN si se canceló."""
+    while not detener.is_set():
+        try:
+            return cola.get(timeout=_ESPERA)
+        except queue.Empty:
+            continue
+    return _FIN
+
+
+def export_annotated_video(ruta_entrada, ruta_salida, estilo="Puntos Simples",
+                           perfil=None, ruta_secuencia=None, progreso=None,
+                           tamano_cola=VIDEO_QUEUE_SIZE, fourcc=VIDEO_FOURCC):
+    """
+    Dibuja los landmarks en cada frame de un video y lo codifica con
+    cv2.VideoWriter, manteniendo resolución y frame rate de la fuente.
+
+    La detección se hace sobre el frame reducido al ancho del perfil y el
+    dibujo sobre el frame original (los landmarks están normalizados).
+
+    Args:
+        ruta_entrada (str): Video de entrada
+        ruta_salida (str): Video anotado de salida
+        estilo (str): Estilo de FaceLandmarkVisualizer (clave de ESTILOS)
+        perfil (str | dict, optional): Perfil de rendimiento
+        ruta_secuencia (str, optional): Si se indica, guarda también los
+            landmarks en formato compacto (src/secuencias.py)
+        progreso (callable, optional): progreso(frames_codificados, total_estimado)
+        tamano_cola (int): Capacidad de cada cola entre etapas
+        fourcc (str): Código de cuatro letras del códec
+
+    Returns:
+        dict: Estadísticas (frames, fps sostenido, frames en vuelo y memoria pico)
+    """
+    import cv2
+
+    if not isinstance(perfil, dict):
+        perfil = get_profile(perfil)
+
+    captura = cv2.VideoCapture(ruta_entrada)
+    if not captura.isOpened():
+        raise ValueError(f"No se pudo abrir el video: {ruta_entrada}")
+
+    fps = captura.get(cv2.CAP_PROP_FPS) or 30.0
+    ancho = int(captura.get(cv2.CAP_PROP_FRAME_WIDTH))
+    alto = int(captura.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_estimado = int(captura.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+
+    escritor = cv2.VideoWriter(ruta_salida, cv2.VideoWriter_fourcc(*fourcc),
+                               fps, (ancho, alto))
+    if not escritor.isOpened():
+        captura.release()
+        raise ValueError(f"No se pudo crear el video de salida: {ruta_salida}")
+
+    # Frames consecutivos: el perfil decide si MediaPipe sigue el rostro
+    # entre frames (más rápido) o lo detecta de nuevo en cada uno
+    detector = FaceLandmarkDetector(perfil, seguimiento=perfil["modo_seguimiento"])
+    visualizer = FaceLandmarkVisualizer(nivel_detalle=perfil["nivel_detalle"])
+    secuencia = None
+    if ruta_secuencia:
+        secuencia = LandmarkSequenceWriter(
+            ruta_secuencia,
+            escala=perfil["escala_secuencia"],
+            fps=fps,
+            num_landmarks=get_landmark_count(perfil)
+        )
+
+    cola_frames = queue.Queue(maxsize=tamano_cola)
+    cola_anotados = queue.Queue(maxsize=tamano_cola)
+    detener = threading.Event()
+    errores = []
+    decodificados = [0]  # Contador compartido (solo lo escribe el decodificador)
+
+    def decodificar():
+        try:
+            while not detener.is_set():
+                ok, frame = captura.read()
+                if not ok:
+                    break
+                decodificados[0] += 1
+                if not _poner(cola_frames, frame, detener):
+                    return
+        except Exception as error:
+            errores.append(error)
+            detener.set()
+        finally:
+            _poner(cola_frames, _FIN, detener)
+
+    def detectar_y_dibujar():
+        try:
+            while True:
+                frame = _tomar(cola_frames, detener)
+                if frame is _FIN:
+                    break
+                reducido = resize_image(frame, max_width=perfil["ancho_maximo"])
+                _, landmarks, _ = detector.detect(reducido, dibujar_preview=False)
+                anotado = visualizer.render(frame, landmarks, estilo)
+                if not _poner(cola_anotados, (anotado, landmarks), detener):
+                    return
+        except Exception as error:
+            errores.append(error)
+            detener.set()
+        finally:
+            _poner(cola_anotados, _FIN, detener)
+
+    hilos = [
+        threading.Thread(target=decodificar, name="video-decodificar", daemon=True),
+        threading.Thread(target=detectar_y_dibujar, name="video-detectar", daemon=True)
+    ]
+
+    memoria_inicial = _memoria_mb()
+    memoria_pico = memoria_inicial
+    en_vuelo_pico = 0
+    codificados = 0
+    inicio = time.perf_counter()
+
+    try:
+        for hilo in hilos:
+            hilo.start()
+
+        while True:
+            item = _tomar(cola_anotados, detener)
+            if item is _FIN:
+                break
+            anotado, landmarks = item
+            en_vuelo_pico = max(en_vuelo_pico, decodificados[0] - codificados)
+
+            escritor.write(anotado)
+            if secuencia is not None:
+                secuencia.write_frame(landmarks)
+            codificados += 1
+
+            memoria = _memoria_mb()
+            if memoria is not None:
+                memoria_pico = max(memoria_pico or 0.0, memoria)
+            if progreso is not None:
+                progreso(codificados, total_estimado)
+    finally:
+        detener.set()
+        for hilo in hilos:
+            hilo.join()
+        captura.release()
+        escritor.release()
+        detector.close()
+        stats_secuencia = secuencia.close() if secuencia is not None else None
+
+    if errores:
+        raise errores[0]
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "frames": codificados,
+        "fps_fuente": fps,
+        "resolucion": (ancho, alto),
+        "segundos": segundos,
+        "fps_sostenido": codificados / segundos if segundos > 0 else 0.0,
+        "frames_en_vuelo_pico": en_vuelo_pico,
+        "memoria_inicial_mb": memoria_inicial,
+        "memoria_pico_mb": memoria_pico,
+        "secuencia": stats_secuencia
+    }
@@ -2,12 +2,21 @@
 """
 Módulo para visualización de landmarks faciales con diferentes estilos.
 Compatible con MediaPipe Face Mesh.
+
+OpenCV se importa al dibujar y las utilidades de dibujo de MediaPipe solo
+en los estilos que las usan (malla y contornos).
 """
 
-import cv2
-import mediapipe as mp
 from .config import LANDMARK_COLOR, LANDMARK_RADIUS, LANDMARK_THICKNESS
 
+# Estilos disponibles (nombre en la interfaz -> método del visualizador)
+ESTILOS = {
+    "Puntos Simples": "draw_points_only",
+    "Malla Conectada": "draw_mesh_tesselation",
+    "Contornos Principales": "draw_contours_only",
+    "Heatmap": "create_heatmap_overlay"
+}
+
 
 class FaceLandmarkVisualizer:
     """
@@ -15,10 +24,27 @@ class FaceLandmarkVisualizer:
     Compatible con MediaPipe Face Mesh.
     """
 
-    def __init__(self):
-        """Inicializa el visualizador."""
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.mp_face_mesh = mp.solutions.face_mesh
+    def __init__(self, nivel_detalle=1):
+        """
+        Inicializa el visualizador.
+
+        Args:
+            nivel_detalle (int): En los estilos por puntos se dibuja 1 de
+                cada nivel_detalle landmarks (ver config.PERFILES)
+        """
+        self.nivel_detalle = max(1, int(nivel_detalle))
+
+    @property
+    def mp_drawing(self):
+        """Utilidades de dibujo de MediaPipe (importadas a demanda)."""
+        import mediapipe as mp
+        return mp.solutions.drawing_utils
+
+    @property
+    def mp_face_mesh(self):
+        """Conexiones de Face Mesh de MediaPipe (importadas a demanda)."""
+        import mediapipe as mp
+        return mp.solutions.face_mesh
 
     def draw_points_only(self, image, face_landmarks):
         """
@@ -31,11 +57,13 @@ class FaceLandmarkVisualizer:
         Returns:
             numpy.ndarray: Imagen con puntos dibujados
         """
+        import cv2
+
         image_copy = image.copy()
 
         if face_landmarks:
-            # Dibujar todos los landmarks como puntos simples
-            for landmark in face_landmarks.landmark:
+            # Dibujar los landmarks como puntos simples
+            for landmark in face_landmarks.landmark[::self.nivel_detalle]:
                 x = int(landmark.x * image.shape[1])
                 y = int(landmark.y * image.shape[0])
                 cv2.circle(image_copy, (x, y), LANDMARK_RADIUS,
@@ -73,14 +101,18 @@ class FaceLandmarkVisualizer:
     def create_heatmap_overlay(self, image, face_landmarks):
         """
         Crea un mapa de calor superpuesto sobre la imagen basado en la densidad de landmarks.
+        Con varios rostros se acumula un único mapa y se superpone una sola vez.
 
         Args:
             image (numpy.ndarray): Imagen donde dibujar
-            face_landmarks: Objeto NormalizedLandmarkList de MediaPipe
+            face_landmarks: Objeto NormalizedLandmarkList de MediaPipe o
+                lista de ellos
 
         Returns:
             numpy.ndarray: Imagen con mapa de calor superpuesto
         """
+        import cv2
+
         import numpy as np
 
         image_copy = image.copy()
@@ -89,9 +121,10 @@ class FaceLandmarkVisualizer:
         # Crear mapa de calor vacío
         heatmap = np.zeros((height, width), dtype=np.float32)
 
-        if face_landmarks:
+        rostros = [face_landmarks] if hasattr(face_landmarks, "landmark") else face_landmarks or []
+        for rostro in rostros:
             # Agregar puntos al mapa de calor con un radio de influencia
-            for landmark in face_landmarks.landmark:
+            for landmark in rostro.landmark[::self.nivel_detalle]:
                 x = int(landmark.x * width)
                 y = int(landmark.y * height)
                 if 0 <= x < width and 0 <= y < height:
@@ -136,4 +169,36 @@ class FaceLandmarkVisualizer:
                 )
             )
 
-        return image_copy
\ No newline at end of file
+        return image_copy
+
+    def render(self, image, landmarks, estilo):
+        """
+        Dibuja todos los rostros con el estilo indicado.
+
+        Args:
+            image (numpy.ndarray): Imagen donde dibujar
+            landmarks: Lista de NormalizedLandmarkList de MediaPipe (o un rostro)
+            estilo (str): Nombre del estilo (clave de ESTILOS)
+
+        Returns:
+            numpy.ndarray: Imagen con los rostros dibujados
+        """
+        if estilo not in ESTILOS:
+            raise ValueError(f"Estilo desconocido: {estilo}. Opciones: {', '.join(ESTILOS)}")
+
+        if hasattr(landmarks, "landmark"):
+            landmarks = [landmarks]
+        if not landmarks:
+            return image.copy()
+
+        # El mapa de calor se mezcla con la imagen: un solo mapa para todos
+        # los rostros, para no oscurecer el fondo una vez por rostro
+        if ESTILOS[estilo] == "create_heatmap_overlay":
+            return self.create_heatmap_overlay(image, landmarks)
+
+        dibujar = getattr(self, ESTILOS[estilo])
+        resultado = image
+        for face_landmarks in landmarks:
+            resultado = dibujar(resultado, face_landmarks)
+
+        return resultado if resultado is not image else image.copy()
@@ -0,0 +1,47 @@
+# tests/conftest.py
+"""
+Datos compartidos por los tests: landmarks aleatorios reproducibles.
+
+pytest agrega este directorio a sys.path, así que los tests importan
+directamente: from conftest import LANDMARKS, formas_aleatorias
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+# Landmarks por rostro en los datos de prueba (pocos, para que sean rápidos)
+LANDMARKS = 20
+
+
+def formas_aleatorias(cantidad, semilla=0, num_landmarks=LANDMARKS):
+    """
+    Rostros con coordenadas normalizadas aleatorias en [0, 1).
+
+    Args:
+        cantidad (int): Cantidad de rostros
+        semilla (int): Semilla del generador (mismos datos en cada corrida)
+        num_landmarks (int): Landmarks por rostro
+
+    Returns:
+        np.ndarray: Array float32 de forma (cantidad, num_landmarks, 3)
+    """
+    rng = np.random.default_rng(semilla)
+    return rng.random((cantidad, num_landmarks, 3)).astype(np.float32)
+
+
+def landmarks_mediapipe(formas):
+    """
+    Imita la lista de NormalizedLandmarkList que entrega MediaPipe, para
+    probar la exportación sin el modelo.
+
+    Args:
+        formas (numpy.ndarray): Rostros (N, landmarks, 3)
+
+    Returns:
+        list: Un objeto con .landmark (puntos con x, y, z) por rostro
+    """
+    return [
+        SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in forma])
+        for forma in formas
+    ]
@@ -0,0 +1,127 @@
+# tests/test_alineacion.py
+"""
+Alineación de formas: recuperación de transformaciones conocidas,
+corrección de proporción y Procrustes generalizado por bloques.
+"""
+
+import numpy as np
+import pytest
+
+from conftest import formas_aleatorias
+from src.alineacion import (
+    procrustes_align,
+    canonical_align,
+    generalized_procrustes,
+    generalized_procrustes_chunked,
+    align_faces
+)
+from src.config import ALIGN_EYE_DISTANCE, ALIGN_CENTER, LANDMARKS_SIN_IRIS
+from src.dataset import LandmarkDatasetStore
+
+OJO_IZQUIERDO, OJO_DERECHO = 33, 263
+
+
+def _rotacion_z(grados):
+    angulo = np.radians(grados)
+    cos, sin = np.cos(angulo), np.sin(angulo)
+    return np.array([[cos, -sin, 0.0], [sin, cos, 0.0], [0.0, 0.0, 1.0]])
+
+
+def _rotacion(semilla=0):
+    """Rotación 3D aleatoria (sin reflexión)."""
+    q, _ = np.linalg.qr(np.random.default_rng(semilla).normal(size=(3, 3)))
+    return q * np.sign(np.linalg.det(q))
+
+
+def _transformar(forma, rotacion, escala, traslacion):
+    centroide = forma.mean(axis=0)
+    return (forma - centroide) @ rotacion.T * escala + centroide + traslacion
+
+
+def _rostro(semilla=0):
+    """Rostro con ojos separados en x, como los de MediaPipe."""
+    forma = formas_aleatorias(1, semilla, num_landmarks=LANDMARKS_SIN_IRIS)[0].astype(np.float64)
+    forma[OJO_IZQUIERDO] = (0.35, 0.4, 0.0)
+    forma[OJO_DERECHO] = (0.65, 0.4, 0.0)
+    return forma
+
+
+def test_procrustes_recupera_rotacion_y_escala():
+    referencia = formas_aleatorias(1)[0].astype(np.float64)
+    formas = np.stack([
+        _transformar(referencia, _rotacion(semilla), 0.5 + semilla, (semilla, -0.3, 0.1))
+        for semilla in range(4)
+    ])
+
+    np.testing.assert_allclose(procrustes_align(formas, referencia),
+                               np.broadcast_to(referencia, formas.shape), atol=1e-5)
+    np.testing.assert_allclose(procrustes_align(formas[2], referencia), referencia, atol=1e-5)
+
+
+def test_marco_canonico_no_depende_de_rotacion_escala_ni_posicion():
+    rostro = _rostro()
+    rotado = _transformar(rostro, _rotacion_z(25), 3.0, (0.2, -0.1, 0.0))
+
+    alineadas = canonical_align(np.stack([rostro, rotado]))
+    np.testing.assert_allclose(alineadas[1], alineadas[0], atol=1e-5)
+
+    ojos = alineadas[0, OJO_DERECHO] - alineadas[0, OJO_IZQUIERDO]
+    assert ojos[1] == pytest.approx(0.0, abs=1e-6)
+    assert np.hypot(ojos[0], ojos[1]) == pytest.approx(ALIGN_EYE_DISTANCE, rel=1e-5)
+    np.testing.assert_allclose(alineadas[0].mean(axis=0), ALIGN_CENTER, atol=1e-5)
+
+
+def test_marco_canonico_rechaza_formas_sin_ojos():
+    with pytest.raises(ValueError):
+        canonical_align(formas_aleatorias(2))
+
+
+def test_align_faces_corrige_la_proporcion_de_la_imagen():
+    # El mismo rostro, rotado en píxeles, en una imagen 16:9
+    alto, ancho = 1080, 1920
+    pixeles = _rostro() * alto
+    rotado = _transformar(pixeles, _rotacion_z(20), 1.0, (0.0, 0.0, 0.0))
+    normalizar = np.array([ancho, alto, ancho], dtype=np.float64)
+
+    alineadas = align_faces(np.stack([pixeles, rotado]) / normalizar, alto, ancho)
+    np.testing.assert_allclose(alineadas[1], alineadas[0], atol=1e-5)
+
+
+def _formas_ruidosas(cantidad, semilla=0):
+    """Variaciones de un rostro base con ruido y transformaciones aleatorias."""
+    rng = np.random.default_rng(semilla)
+    base = formas_aleatorias(1, semilla)[0].astype(np.float64)
+    return np.stack([
+        _transformar(base + rng.normal(scale=0.01, size=base.shape),
+                     _rotacion(semilla + i), rng.uniform(0.5, 2.0), rng.normal(size=3))
+        for i in range(cantidad)
+    ]).astype(np.float32)
+
+
+def test_gpa_por_bloques_coincide_con_el_de_memoria():
+    formas = _formas_ruidosas(50)
+    alineadas, media = generalized_procrustes(formas)
+
+    np.testing.assert_allclose(generalized_procrustes_chunked(formas, tamano_bloque=7),
+                               media, atol=1e-5)
+    bloques = lambda: (formas[i:i + 11] for i in range(0, len(formas), 11))
+    np.testing.assert_allclose(generalized_procrustes_chunked(bloques), media, atol=1e-5)
+
+    # Todas las formas quedan cerca de la media (solo difieren por el ruido)
+    assert alineadas.shape == formas.shape
+    assert np.abs(alineadas - media).max() < 0.1
+
+
+def test_gpa_desde_el_almacen_usa_el_tamano_de_imagen(tmp_path):
+    formas = _formas_ruidosas(20) * 0.1 + 0.5
+    with LandmarkDatasetStore(str(tmp_path), capacidad_shard=6,
+                              num_landmarks=formas.shape[1]) as store:
+        for i, forma in enumerate(formas):
+            store.append(forma, f"imagen_{i}.jpg", 480, 640)
+    lector = LandmarkDatasetStore(str(tmp_path), solo_lectura=True)
+
+    # El almacén guarda coordenadas normalizadas: x y z pasan a unidades de alto
+    isotropas = formas.copy()
+    isotropas[..., [0, 2]] *= 640 / 480
+    np.testing.assert_allclose(generalized_procrustes_chunked(lector, tamano_bloque=4),
+                               generalized_procrustes_chunked(isotropas), atol=1e-5)
@@ -0,0 +1,62 @@
+# tests/test_dataset.py
+"""
+Ida y vuelta y recuperación ante caídas del almacén de datasets.
+"""
+
+import numpy as np
+import pytest
+
+from conftest import LANDMARKS, formas_aleatorias
+from src.dataset import LandmarkDatasetStore
+
+
+def test_ida_y_vuelta_entre_shards(tmp_path):
+    rostros = formas_aleatorias(25)
+    with LandmarkDatasetStore(str(tmp_path), capacidad_shard=8,
+                              num_landmarks=LANDMARKS) as store:
+        for i, rostro in enumerate(rostros):
+            store.append(rostro, f"imagen_{i // 2}.jpg", 480, 640, rostro_idx=i % 2)
+
+    lector = LandmarkDatasetStore(str(tmp_path), solo_lectura=True)
+    assert len(lector) == 25
+    np.testing.assert_array_equal(lector.get_landmarks(np.arange(25)), rostros)
+
+    landmarks, meta = lector[17]
+    np.testing.assert_array_equal(landmarks, rostros[17])
+    assert meta["fuente"] == "imagen_8.jpg"
+    assert meta["rostro_idx"] == 1
+    assert meta["expresion"] is None
+    np.testing.assert_array_equal(lector.column("alto"), np.full(25, 480))
+
+
+def test_descarta_lo_escrito_despues_del_checkpoint(tmp_path):
+    rostros = formas_aleatorias(12)
+    store = LandmarkDatasetStore(str(tmp_path), capacidad_shard=4,
+                                 num_landmarks=LANDMARKS, checkpoint_cada=1000)
+    for i, rostro in enumerate(rostros[:6]):
+        store.append(rostro, f"confirmada_{i}.jpg", 10, 10)
+    store.checkpoint()
+    for i, rostro in enumerate(rostros[6:9]):
+        store.append(rostro, f"perdida_{i}.jpg", 10, 10)
+    # Caída: el almacén se reabre sin close() ni checkpoint()
+
+    reabierto = LandmarkDatasetStore(str(tmp_path))
+    assert len(reabierto) == 6
+    np.testing.assert_array_equal(reabierto.get_landmarks(np.arange(6)), rostros[:6])
+
+    # La ingesta continúa sobre lo confirmado
+    for i, rostro in enumerate(rostros[9:]):
+        reabierto.append(rostro, f"nueva_{i}.jpg", 10, 10)
+    reabierto.close()
+
+    lector = LandmarkDatasetStore(str(tmp_path), solo_lectura=True)
+    assert len(lector) == 9
+    np.testing.assert_array_equal(lector.get_landmarks(np.arange(6, 9)), rostros[9:])
+    assert lector[5][1]["fuente"] == "confirmada_5.jpg"
+    assert lector[6][1]["fuente"] == "nueva_0.jpg"
+
+
+def test_rechaza_cantidad_de_landmarks_distinta(tmp_path):
+    with LandmarkDatasetStore(str(tmp_path), num_landmarks=LANDMARKS) as store:
+        with pytest.raises(ValueError):
+            store.append(np.zeros((LANDMARKS + 1, 3)), "x.jpg", 10, 10)
@@ -0,0 +1,37 @@
+# tests/test_exportacion.py
+"""
+Formato de las exportaciones de landmarks.
+"""
+
+import numpy as np
+
+from conftest import formas_aleatorias, landmarks_mediapipe
+from src.exportacion import export_landmarks_csv
+
+
+def test_csv_respeta_los_decimales():
+    formas = formas_aleatorias(2)
+    csv, nombre = export_landmarks_csv(landmarks_mediapipe(formas), 480, 640, decimales=3)
+    lineas = csv.splitlines()
+
+    assert nombre.endswith(".csv")
+    assert lineas[0] == "rostro_id,landmark_id,x,y,z,x_normalizado,y_normalizado,visibilidad"
+    assert len(lineas) == 1 + formas.shape[0] * formas.shape[1]
+    assert ".4f" not in csv
+
+    campos = lineas[1].split(",")
+    x, y, z = formas[0, 0]
+    assert campos[:5] == ["0", "0", f"{int(x * 640):.4f}", f"{int(y * 480):.4f}", f"{z:.3f}"]
+    assert campos[5:] == [f"{x:.3f}", f"{y:.3f}", "1.000"]
+
+
+def test_csv_con_formas_alineadas():
+    formas = formas_aleatorias(1)
+    alineados = formas * 2
+    csv, _ = export_landmarks_csv(landmarks_mediapipe(formas), 480, 640,
+                                  alineados=alineados, decimales=4)
+    lineas = csv.splitlines()
+
+    assert lineas[0].endswith(",x_alineado,y_alineado,z_alineado")
+    valores = np.array([linea.split(",")[-3:] for linea in lineas[1:]], dtype=np.float64)
+    np.testing.assert_allclose(valores, alineados[0], atol=5e-5)
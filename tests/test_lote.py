@@ -0,0 +1,111 @@
+# tests/test_lote.py
+"""
+Escritura del ZIP de un lote: carpetas por imagen, errores y resumen.csv.
+"""
+
+import csv
+import io
+import json
+import zipfile
+
+import pytest
+
+from conftest import LANDMARKS, formas_aleatorias, landmarks_mediapipe
+from src.lote import BatchZipWriter, COLUMNAS_RESUMEN
+
+
+def _resultado(indice, nombre, rostros=0, error=None, analizado=True):
+    """Resultado con la misma forma que los que entrega process_batch."""
+    landmarks = landmarks_mediapipe(formas_aleatorias(rostros, semilla=indice))
+    expresiones = [
+        {
+            "rostro_id": i,
+            "expresion_detectada": "neutral",
+            "apertura_boca": 0.1 * (i + 1),
+            "apertura_ojos": {"izquierdo": 0.2, "derecho": 0.4, "promedio": 0.3},
+            "inclinacion_cabeza": -2.5
+        }
+        for i in range(rostros)
+    ] if analizado else []
+    return {
+        "indice": indice,
+        "nombre": nombre,
+        "alto": 480,
+        "ancho": 640,
+        "landmarks": landmarks,
+        "info": None,
+        "alineados": None,
+        "expresiones": expresiones,
+        "error": error
+    }
+
+
+def _escribir(formato, resultados, **kwargs):
+    destino = io.BytesIO()
+    with BatchZipWriter(destino, formato=formato, **kwargs) as zip_writer:
+        for resultado in resultados:
+            zip_writer.add(resultado)
+    stats = zip_writer.close()
+    return zipfile.ZipFile(destino), stats
+
+
+def _resumen(archivo_zip):
+    with archivo_zip.open("resumen.csv") as f:
+        return list(csv.DictReader(io.TextIOWrapper(f, encoding="utf-8")))
+
+
+def test_zip_json_con_errores_y_sin_rostros():
+    # Llegan fuera de orden, como los entrega process_batch
+    archivo_zip, stats = _escribir("JSON", [
+        _resultado(2, "sin_rostros.png"),
+        _resultado(0, "fotos/grupo.jpg", rostros=2),
+        _resultado(1, "roto.jpg", error="No se pudo abrir la imagen: formato desconocido")
+    ], decimales=4)
+
+    assert stats == {"imagenes": 3, "rostros": 2, "errores": 1}
+    assert sorted(archivo_zip.namelist()) == [
+        "0000_grupo/expresiones.json", "0000_grupo/landmarks.json", "resumen.csv"
+    ]
+
+    landmarks = json.loads(archivo_zip.read("0000_grupo/landmarks.json"))
+    assert landmarks["metadata"]["total_landmarks"] == 2 * LANDMARKS
+    assert landmarks["metadata"]["decimales"] == 4
+    assert len(landmarks["landmarks"]) == landmarks["metadata"]["total_landmarks"]
+    assert {fila["rostro_id"] for fila in landmarks["landmarks"]} == {0, 1}
+
+    expresiones = json.loads(archivo_zip.read("0000_grupo/expresiones.json"))
+    assert [datos["rostro_id"] for datos in expresiones["expressions"]] == [0, 1]
+
+    filas = _resumen(archivo_zip)
+    assert list(filas[0]) == list(COLUMNAS_RESUMEN)
+    assert [(f["indice"], f["archivo"], f["rostro_id"]) for f in filas] == [
+        ("0", "fotos/grupo.jpg", "0"),
+        ("0", "fotos/grupo.jpg", "1"),
+        ("1", "roto.jpg", ""),
+        ("2", "sin_rostros.png", "")
+    ]
+    assert filas[1]["apertura_boca"] == "0.2"
+    assert filas[1]["apertura_ojos"] == "0.3"
+    assert filas[0]["error"] == ""
+    assert filas[2]["error"].startswith("No se pudo abrir la imagen")
+    assert filas[3]["error"] == "Sin rostros detectados"
+
+
+def test_zip_csv_sin_analisis_de_expresiones():
+    archivo_zip, stats = _escribir("csv", [_resultado(0, "a.jpg", rostros=1, analizado=False)],
+                                   decimales=3)
+
+    assert stats == {"imagenes": 1, "rostros": 1, "errores": 0}
+    assert sorted(archivo_zip.namelist()) == ["0000_a/landmarks.csv", "resumen.csv"]
+
+    lineas = archivo_zip.read("0000_a/landmarks.csv").decode("utf-8").splitlines()
+    assert lineas[0].startswith("rostro_id,landmark_id,")
+    assert lineas[1].split(",")[5] == f"{formas_aleatorias(1)[0, 0, 0]:.3f}"
+
+    filas = _resumen(archivo_zip)
+    assert [(f["rostro_id"], f["expresion"], f["error"]) for f in filas] == [("0", "", "")]
+
+
+def test_rechaza_formato_desconocido():
+    with pytest.raises(ValueError):
+        BatchZipWriter(io.BytesIO(), formato="XML")
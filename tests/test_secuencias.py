@@ -0,0 +1,76 @@
+# tests/test_secuencias.py
+"""
+Ida y vuelta del formato compacto de secuencias (.lmsq).
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from conftest import LANDMARKS, formas_aleatorias
+from src.secuencias import LandmarkSequenceWriter, LandmarkSequenceReader
+
+ESCALA = 4096
+
+
+def _frames(cantidad, semilla=0):
+    """Frames con 0, 1 o 2 rostros en coordenadas normalizadas."""
+    rostros_por_frame = [i % 3 for i in range(cantidad)]
+    rostros = formas_aleatorias(sum(rostros_por_frame), semilla) * 0.8 + 0.1
+    return np.split(rostros, np.cumsum(rostros_por_frame)[:-1])
+
+
+@pytest.fixture
+def secuencia(tmp_path):
+    ruta = str(tmp_path / "prueba.lmsq")
+    frames = _frames(150)
+    with LandmarkSequenceWriter(ruta, escala=ESCALA, frames_por_bloque=16,
+                                fps=25.0, num_landmarks=LANDMARKS) as escritor:
+        for frame in frames:
+            escritor.write_frame(frame)
+    return ruta, frames, escritor.stats()
+
+
+def test_ida_y_vuelta_dentro_del_paso_de_cuantizacion(secuencia):
+    ruta, frames, _ = secuencia
+    with LandmarkSequenceReader(ruta) as lector:
+        assert len(lector) == len(frames)
+        assert lector.fps == 25.0
+        for original, leido in zip(frames, lector.iter_frames()):
+            assert leido.shape == original.shape
+            if original.size:
+                assert np.abs(leido - original).max() <= 0.5 / ESCALA + 1e-7
+
+
+def test_acceso_aleatorio_por_rango_e_indice(secuencia):
+    ruta, frames, _ = secuencia
+    with LandmarkSequenceReader(ruta) as lector:
+        # Rango que cruza varios bloques
+        leidos = lector.read_frames(13, 50)
+        assert len(leidos) == 37
+        for original, leido in zip(frames[13:50], leidos):
+            np.testing.assert_allclose(leido, original, atol=0.5 / ESCALA + 1e-7)
+
+        np.testing.assert_allclose(lector[-1], frames[-1], atol=0.5 / ESCALA + 1e-7)
+        with pytest.raises(IndexError):
+            lector[len(frames)]
+
+
+def test_estadisticas_coinciden_con_el_archivo(secuencia):
+    ruta, _, stats = secuencia
+    with LandmarkSequenceReader(ruta) as lector:
+        assert lector.stats == stats
+        assert lector.stats["bytes_archivo"] == os.path.getsize(ruta)
+
+
+def test_archivo_incompleto(secuencia, tmp_path):
+    ruta, _, _ = secuencia
+    truncado = str(tmp_path / "truncado.lmsq")
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    with open(truncado, "wb") as f:
+        f.write(datos[:-4])
+
+    with pytest.raises(ValueError):
+        LandmarkSequenceReader(truncado)
@@ -0,0 +1,49 @@
+# tests/test_similitud.py
+"""
+Búsqueda por similitud y guardado/carga del índice de formas.
+"""
+
+import numpy as np
+import pytest
+
+from conftest import formas_aleatorias
+from src.similitud import ShapeIndex
+
+
+@pytest.mark.parametrize("metodo", ["exacto", "proyeccion"])
+def test_knn_encuentra_la_misma_forma(metodo):
+    formas = formas_aleatorias(200)
+    indice = ShapeIndex(metodo=metodo)
+    indice.add(formas, ids=np.arange(1000, 1200))
+
+    ids, distancias = indice.knn(formas[[3, 150]], k=4)
+    assert ids.shape == (2, 4)
+    np.testing.assert_array_equal(ids[:, 0], [1003, 1150])
+    assert np.all(np.diff(distancias, axis=1) >= 0)
+
+
+def test_knn_rechaza_k_invalido():
+    indice = ShapeIndex()
+    indice.add(formas_aleatorias(5))
+    with pytest.raises(ValueError):
+        indice.knn(formas_aleatorias(1)[0], k=0)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_guardar_y_cargar(tmp_path, mmap):
+    formas = formas_aleatorias(120)
+    consultas = formas_aleatorias(3, semilla=1)
+    indice = ShapeIndex(metodo="proyeccion", dimension_proyeccion=8, semilla=7)
+    indice.add(formas)
+    esperado = indice.knn(consultas, k=5)
+    indice.save(str(tmp_path))
+
+    cargado = ShapeIndex.load(str(tmp_path), mmap=mmap)
+    assert len(cargado) == len(indice)
+    obtenido = cargado.knn(consultas, k=5)
+    np.testing.assert_array_equal(obtenido[0], esperado[0])
+    np.testing.assert_allclose(obtenido[1], esperado[1], rtol=1e-5)
+
+    # Admite nuevas inserciones después de cargar
+    cargado.add(consultas[:1], ids=[500])
+    assert cargado.knn(consultas[:1], k=1)[0][0, 0] == 500